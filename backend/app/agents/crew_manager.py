@@ -1,16 +1,86 @@
 from crewai import Agent, Crew, Task, Process, LLM
 from crewai.project import CrewBase, agent, crew, task
+import asyncio
 import yaml
 import os
-from typing import Dict, Any, Optional
+import pickle
+import tempfile
+import orjson
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List
 import logging
-from langdetect import detect
+from functools import lru_cache
 from ..config.settings import get_settings
+from ..models.schemas import QueryRequest
+from ..models.database import get_collection, Collections
 from ..tools.mongodb_tool import MongoDBTool
 from ..tools.external_api_tool import ExternalAPITool
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 logger = logging.getLogger(__name__)
 
+# Languages loaded into the langdetect factory; the full set of 55 profiles is
+# large and slow to initialise, and queries outside this list fall back to "en"
+DETECT_LANGUAGES = (
+    "en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko",
+    "zh-cn", "zh-tw", "hi", "ar", "bn", "id"
+)
+
+# Task description prefixes for the known languages; English needs none
+LANGUAGE_PREFIXES = {lang: f"[Language: {lang}] " for lang in DETECT_LANGUAGES if lang != "en"}
+LANGUAGE_PREFIXES["en"] = ""
+
+# Only the leading part of a query is used for detection, which bounds cache memory
+DETECT_SAMPLE_LENGTH = 200
+
+_detector_factory = None
+
+
+def _get_detector_factory():
+    """Build the langdetect factory on first use with the restricted profile set."""
+    global _detector_factory
+    if _detector_factory is None:
+        from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+        
+        profiles = []
+        for lang in DETECT_LANGUAGES:
+            with open(os.path.join(PROFILES_DIRECTORY, lang), 'r', encoding='utf-8') as f:
+                profiles.append(f.read())
+        
+        factory = DetectorFactory()
+        factory.load_json_profile(profiles)
+        factory.set_seed(0)  # Deterministic results so they can be cached
+        _detector_factory = factory
+    return _detector_factory
+
+
+@lru_cache(maxsize=4096)
+def _detect_language_cached(sample: str) -> str:
+    """Detect the language of a text sample, memoized per sample."""
+    try:
+        detector = _get_detector_factory().create()
+        detector.append(sample)
+        return detector.detect()
+    except Exception:
+        return "en"  # Default to English
+
+
+TASK_EXPECTED_OUTPUT = (
+    "A comprehensive and helpful response to the user's query, "
+    "formatted in a clear and professional manner."
+)
+
+# Maximum number of crews kicked off in parallel for a single batch request
+BATCH_MAX_CONCURRENCY = 10
+
+# Batch API statuses after which a batch will never produce output
+BATCH_FAILED_STATUSES = frozenset({"failed", "expired", "cancelled"})
+
 
 class CrewManager:
     """Manages the CrewAI agents and orchestrates their interactions."""
@@ -37,30 +107,64 @@ class CrewManager:
         self.support_agent = self._create_support_agent()
         self.dashboard_agent = self._create_dashboard_agent()
         
+        # Idle crews per agent; Crew construction is costly so crews are reused
+        # across requests and only built on demand when all of them are busy.
+        # Each crew runs its own copy of the agent, since kickoffs run concurrently
+        self.support_crews: List[Crew] = [self._build_crew(self.support_agent)]
+        self.dashboard_crews: List[Crew] = [self._build_crew(self.dashboard_agent)]
+        
+        # Bounds in-flight LLM calls so bursts queue here instead of hitting provider rate limits
+        self._llm_semaphore = asyncio.Semaphore(settings.openai_max_concurrency)
+        
+        # Created on first Batch API submission
+        self._openai_client = None
+        
         logger.info("CrewManager initialized successfully")
     
     def _load_config(self) -> Dict[str, Any]:
-        """Load agent configurations from YAML file."""
+        """Load agent configurations from YAML file, using a pickled copy when it is up to date."""
+        cache_path = self.config_path + ".pkl"
+        try:
+            if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(self.config_path):
+                with open(cache_path, 'rb') as f:
+                    return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable agent config cache: {e}")
+        
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-            return config
+                config = yaml.load(f, Loader=_YamlLoader)
         except Exception as e:
             logger.error(f"Failed to load agent config: {e}")
             raise
+        
+        self._write_config_cache(cache_path, config)
+        return config
+    
+    def _write_config_cache(self, cache_path: str, config: Dict[str, Any]) -> None:
+        """Atomically write the parsed agent config next to the YAML file."""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            # The cache is only an optimisation (e.g. read-only filesystem)
+            logger.warning(f"Could not write agent config cache: {e}")
     
     def _create_support_agent(self) -> Agent:
         """Create the support agent."""
         config = self.agents_config['support_agent']
+        settings = get_settings()
         
         return Agent(
             role=config['role'],
             goal=config['goal'],
             backstory=config['backstory'],
-            verbose=config.get('verbose', True),
+            verbose=config.get('verbose', False) and settings.debug,
             allow_delegation=config.get('allow_delegation', False),
             max_iter=config.get('max_iter', 25),
-            memory=config.get('memory', True),
+            memory=config.get('memory', False) and settings.crew_memory,
             tools=[self.mongodb_tool, self.external_api_tool],
             llm=self.llm
         )
@@ -68,42 +172,65 @@ class CrewManager:
     def _create_dashboard_agent(self) -> Agent:
         """Create the dashboard agent."""
         config = self.agents_config['dashboard_agent']
+        settings = get_settings()
         
         return Agent(
             role=config['role'],
             goal=config['goal'],
             backstory=config['backstory'],
-            verbose=config.get('verbose', True),
+            verbose=config.get('verbose', False) and settings.debug,
             allow_delegation=config.get('allow_delegation', False),
             max_iter=config.get('max_iter', 20),
-            memory=config.get('memory', True),
+            memory=config.get('memory', False) and settings.crew_memory,
             tools=[self.mongodb_tool],  # Dashboard agent only needs read access
             llm=self.llm
         )
     
+    def _build_crew(self, agent: Agent) -> Crew:
+        """Create a single-agent crew on a copy of agent; tasks are assigned per request."""
+        return Crew(
+            agents=[agent.copy()],
+            tasks=[],
+            process=Process.sequential,
+            verbose=get_settings().crew_verbose,
+            max_rpm=get_settings().openai_rpm_limit
+        )
+    
+    async def _kickoff(self, agent: Agent, crews: List[Crew], task: Task) -> Any:
+        """Run a task on an idle crew for the agent."""
+        async with self._llm_semaphore:
+            crew = crews.pop() if crews else self._build_crew(agent)
+            # Hand the task to this crew's own agent copy
+            task.agent = crew.agents[0]
+            crew.tasks = [task]
+            try:
+                # kickoff() blocks on the LLM round-trip; run it off the event loop
+                return await asyncio.to_thread(crew.kickoff)
+            finally:
+                crew.tasks = []
+                crews.append(crew)
+    
     def _detect_language(self, text: str) -> str:
         """Detect the language of the input text."""
-        try:
-            return detect(text)
-        except:
-            return "en"  # Default to English
+        return _detect_language_cached(text[:DETECT_SAMPLE_LENGTH])
     
     def _create_task(self, agent: Agent, query: str, language: str = "en", context: Optional[Dict] = None) -> Task:
         """Create a task for the given agent."""
         
         # Add language context to the query
-        enhanced_query = query
-        if language != "en":
-            enhanced_query = f"[Language: {language}] {query}"
+        prefix = LANGUAGE_PREFIXES.get(language)
+        if prefix is None:
+            prefix = f"[Language: {language}] "
+        parts = [prefix, query]
         
         # Add context if provided
         if context:
-            context_str = "\n".join([f"{k}: {v}" for k, v in context.items()])
-            enhanced_query += f"\n\nAdditional Context:\n{context_str}"
+            parts.append("\n\nAdditional Context:\n")
+            parts.append("\n".join(f"{k}: {v}" for k, v in context.items()))
         
         return Task(
-            description=enhanced_query,
-            expected_output="A comprehensive and helpful response to the user's query, formatted in a clear and professional manner.",
+            description="".join(parts),
+            expected_output=TASK_EXPECTED_OUTPUT,
             agent=agent
         )
     
@@ -117,15 +244,8 @@ class CrewManager:
             # Create task for support agent
             task = self._create_task(self.support_agent, query, language, context)
             
-            # Create crew and execute
-            crew = Crew(
-                agents=[self.support_agent],
-                tasks=[task],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            result = crew.kickoff()
+            # Execute on a reusable crew
+            result = await self._kickoff(self.support_agent, self.support_crews, task)
             
             return {
                 "response": str(result),
@@ -138,25 +258,23 @@ class CrewManager:
             logger.error(f"Support query error: {e}")
             raise
     
-    async def handle_dashboard_query(self, query: str, language: Optional[str] = None, context: Optional[Dict] = None) -> Dict[str, Any]:
+    async def handle_dashboard_query(self, query: str, language: Optional[str] = None, context: Optional[Dict] = None,
+                                     batch_mode: bool = False) -> Dict[str, Any]:
         """Handle a dashboard agent query."""
         try:
             # Detect language if not provided
             if not language:
                 language = self._detect_language(query)
             
+            # Non-realtime queries go through the cheaper provider Batch API
+            if batch_mode:
+                return await self._submit_dashboard_batch(query, language, context)
+            
             # Create task for dashboard agent
             task = self._create_task(self.dashboard_agent, query, language, context)
             
-            # Create crew and execute
-            crew = Crew(
-                agents=[self.dashboard_agent],
-                tasks=[task],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            result = crew.kickoff()
+            # Execute on a reusable crew
+            result = await self._kickoff(self.dashboard_agent, self.dashboard_crews, task)
             
             return {
                 "response": str(result),
@@ -169,6 +287,151 @@ class CrewManager:
             logger.error(f"Dashboard query error: {e}")
             raise
     
+    def _get_openai_client(self):
+        """Get the async OpenAI client used for Batch API calls."""
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+            self._openai_client = AsyncOpenAI(api_key=get_settings().openai_api_key)
+        return self._openai_client
+    
+    async def _submit_dashboard_batch(self, query: str, language: str, context: Optional[Dict]) -> Dict[str, Any]:
+        """Submit a dashboard query to the Batch API and record it for later retrieval.
+        
+        Batch requests are single chat completions, so the agent answers from its
+        role and backstory without running database tools.
+        """
+        settings = get_settings()
+        task = self._create_task(self.dashboard_agent, query, language, context)
+        system_prompt = f"{self.dashboard_agent.role}\n\n{self.dashboard_agent.goal}\n\n{self.dashboard_agent.backstory}"
+        
+        request_line = {
+            "custom_id": f"dashboard-{uuid.uuid4().hex}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": settings.openai_batch_model or settings.openai_model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": task.description}
+                ]
+            }
+        }
+        
+        client = self._get_openai_client()
+        batch_file = await client.files.create(
+            file=("dashboard_batch.jsonl", orjson.dumps(request_line) + b"\n"),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        await get_collection(Collections.AGENT_BATCHES).insert_one({
+            "batch_id": batch.id,
+            "agent": "dashboard",
+            "query": query,
+            "language": language,
+            "context": context,
+            "status": batch.status,
+            "response": None,
+            "created_date": datetime.now(timezone.utc)
+        })
+        
+        logger.info(f"Submitted dashboard query to Batch API: {batch.id}")
+        
+        return {
+            "response": f"Query submitted for batch processing. Retrieve the result at /api/v1/results/{batch.id}",
+            "data": {"batch_id": batch.id, "status": batch.status},
+            "agent": "dashboard",
+            "language": language,
+            "context": context
+        }
+    
+    async def get_batch_result(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Get the result of a Batch API submission, refreshing it from the provider if still pending."""
+        collection = get_collection(Collections.AGENT_BATCHES)
+        record = await collection.find_one({"batch_id": batch_id})
+        if not record:
+            return None
+        
+        if record["response"] is None:
+            client = self._get_openai_client()
+            batch = await client.batches.retrieve(batch_id)
+            update = {"status": batch.status}
+            
+            if batch.status == "completed":
+                update["response"] = await self._read_batch_response(client, batch)
+                update["completed_date"] = datetime.now(timezone.utc)
+            elif batch.status in BATCH_FAILED_STATUSES:
+                update["response"] = f"Batch {batch.status} without producing a result"
+                update["completed_date"] = datetime.now(timezone.utc)
+            
+            await collection.update_one({"batch_id": batch_id}, {"$set": update})
+            record.update(update)
+        
+        return {
+            "response": record["response"] or f"Batch is {record['status']}, result not available yet",
+            "data": {"batch_id": batch_id, "status": record["status"]},
+            "agent": record["agent"],
+            "language": record["language"],
+            "context": record["context"]
+        }
+    
+    async def _read_batch_response(self, client, batch) -> str:
+        """Read the answer, or the error, for a completed single-request batch."""
+        file_id = batch.output_file_id or batch.error_file_id
+        if not file_id:
+            return "Batch completed without producing a result"
+        
+        content = await client.files.content(file_id)
+        line = orjson.loads(content.text.splitlines()[0])
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") == 200:
+            return body["choices"][0]["message"]["content"]
+        
+        error = body.get("error") or line.get("error") or {}
+        logger.error(f"Batch {batch.id} request failed: {error}")
+        return f"Batch request failed: {error.get('message', 'unknown error')}"
+    
+    async def handle_support_batch(self, queries: List[QueryRequest]) -> List[Dict[str, Any]]:
+        """Handle a batch of support agent queries concurrently."""
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        
+        async def run_query(request: QueryRequest) -> Dict[str, Any]:
+            language = request.language or self._detect_language(request.query)
+            task = self._create_task(self.support_agent, request.query, language, request.context)
+            
+            async with semaphore:
+                result = await self._kickoff(self.support_agent, self.support_crews, task)
+            
+            return {
+                "response": str(result),
+                "agent": "support",
+                "language": language,
+                "context": request.context
+            }
+        
+        results = await asyncio.gather(*(run_query(q) for q in queries), return_exceptions=True)
+        
+        responses = []
+        for request, result in zip(queries, results):
+            # BaseException, so a cancelled query becomes an error entry as well
+            if isinstance(result, BaseException):
+                logger.error(f"Support batch query error: {result}")
+                result = {
+                    "response": f"Failed to process query: {result}",
+                    "agent": "support",
+                    "language": request.language,
+                    "context": request.context,
+                    "data": {"error": str(result)}
+                }
+            responses.append(result)
+        
+        return responses
+    
     def get_agent_info(self) -> Dict[str, Any]:
         """Get information about the available agents."""
         return {
@@ -1,19 +1,73 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional
+import asyncio
 import logging
+from datetime import datetime, timezone
+from bson import ObjectId
+import orjson
 
 from ..models.schemas import (
     CreateClientRequest, CreateOrderRequest, 
     Client, Order, Payment, Course, Class, Attendance,
-    QueryRequest, QueryResponse
+    QueryRequest, QueryResponse,
+    COURSE_SUMMARY_PROJECTION, ORDER_SUMMARY_PROJECTION
 )
 from ..models.database import get_collection, Collections
+from ..models.structs import encode_document, encode_documents
 from ..tools.external_api_tool import ExternalAPITool
+from ..utils.cache import cached, minute_bucket_key
+from ..config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Shared tool instance, reused across requests
+external_api = ExternalAPITool()
+
+
+def _build_query(*filters) -> dict:
+    """Build a MongoDB filter from (field, value) pairs, skipping unset values."""
+    return {field: value for field, value in filters if value is not None}
+
+
+def _stringify_ids(*fields: str) -> dict:
+    """Build an $addFields stage that converts ObjectId fields to strings inside MongoDB."""
+    return {"$addFields": {
+        field: {"$ifNull": [{"$toString": f"${field}"}, "$$REMOVE"]}
+        for field in fields
+    }}
+
+
+async def _ndjson_lines(cursor):
+    """Yield cursor documents as newline-delimited JSON."""
+    async for doc in cursor:
+        yield orjson.dumps(doc, default=str) + b"\n"
+
+
+async def _list_response(collection, pipeline: list, limit: int, stream: bool):
+    """Return pipeline results as a streamed NDJSON response or a JSON array.
+
+    Documents come straight from MongoDB, so the JSON array is encoded with
+    msgspec instead of being validated by pydantic.
+    """
+    if stream:
+        return StreamingResponse(
+            _ndjson_lines(collection.aggregate(pipeline)),
+            media_type="application/x-ndjson"
+        )
+    docs = await collection.aggregate(pipeline).to_list(length=limit)
+    return Response(content=encode_documents(docs), media_type="application/json")
+
+
+# Per-collection ObjectId -> str conversion stages
+CLIENT_ID_STAGE = _stringify_ids("_id")
+ORDER_ID_STAGE = _stringify_ids("_id", "client_id", "service_id")
+COURSE_ID_STAGE = _stringify_ids("_id")
+CLASS_ID_STAGE = _stringify_ids("_id", "course_id")
+ORDER_SUMMARY_ID_STAGE = _stringify_ids("_id", "client_id")
+
 
 @router.get("/health")
 async def health_check():
@@ -26,8 +80,9 @@ async def health_check():
 async def create_client(client_data: CreateClientRequest):
     """Create a new client via external API."""
     try:
-        external_api = ExternalAPITool()
-        result = external_api._run(
+        # The tool blocks on its database calls; keep it off the event loop
+        result = await asyncio.to_thread(
+            external_api._run,
             "create_client",
             name=client_data.name,
             email=client_data.email,
@@ -47,26 +102,19 @@ async def create_client(client_data: CreateClientRequest):
 async def get_clients(
     status: Optional[str] = None,
     limit: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    stream: bool = False
 ):
-    """Get clients with optional filtering."""
+    """Get clients with optional filtering. Set stream to receive NDJSON."""
     try:
         collection = get_collection(Collections.CLIENTS)
         
         # Build query
-        query = {}
-        if status:
-            query["status"] = status
+        query = _build_query(("status", status or None))
         
-        # Execute query
-        cursor = collection.find(query).skip(skip).limit(limit)
-        clients = await cursor.to_list(length=limit)
-        
-        # Convert ObjectId to string
-        for client in clients:
-            client["_id"] = str(client["_id"])
-        
-        return clients
+        # Execute query, converting ObjectIds to strings server-side
+        pipeline = [{"$match": query}, {"$skip": skip}, {"$limit": limit}, CLIENT_ID_STAGE]
+        return await _list_response(collection, pipeline, limit, stream)
     except Exception as e:
         logger.error(f"Error fetching clients: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -76,15 +124,15 @@ async def get_clients(
 async def get_client_by_id(client_id: str):
     """Get a specific client by ID."""
     try:
-        from bson import ObjectId
         collection = get_collection(Collections.CLIENTS)
         
         client = await collection.find_one({"_id": ObjectId(client_id)})
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
         
-        client["_id"] = str(client["_id"])
-        return client
+        return Response(content=encode_document(client), media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching client: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -95,8 +143,9 @@ async def get_client_by_id(client_id: str):
 async def create_order(order_data: CreateOrderRequest):
     """Create a new order via external API."""
     try:
-        external_api = ExternalAPITool()
-        result = external_api._run(
+        # The tool blocks on its database calls; keep it off the event loop
+        result = await asyncio.to_thread(
+            external_api._run,
             "create_order",
             client_email=order_data.client_email,
             service_type=order_data.service_type,
@@ -115,32 +164,35 @@ async def get_orders(
     client_id: Optional[str] = None,
     status: Optional[str] = None,
     limit: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    stream: bool = False,
+    summary: bool = False
 ):
-    """Get orders with optional filtering."""
+    """Get orders with optional filtering. Set stream to receive NDJSON.
+
+    Set summary to return only the listing fields (see OrderSummary).
+    """
     try:
-        from bson import ObjectId
         collection = get_collection(Collections.ORDERS)
         
         # Build query
-        query = {}
-        if client_id:
-            query["client_id"] = ObjectId(client_id)
-        if status:
-            query["status"] = status
-        
-        # Execute query
-        cursor = collection.find(query).sort("created_date", -1).skip(skip).limit(limit)
-        orders = await cursor.to_list(length=limit)
-        
-        # Convert ObjectId to string
-        for order in orders:
-            order["_id"] = str(order["_id"])
-            order["client_id"] = str(order["client_id"])
-            if "service_id" in order:
-                order["service_id"] = str(order["service_id"])
+        query = _build_query(
+            ("client_id", ObjectId(client_id) if client_id else None),
+            ("status", status or None)
+        )
         
-        return orders
+        # Execute query, converting ObjectIds to strings server-side
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"created_date": -1}},
+            {"$skip": skip},
+            {"$limit": limit}
+        ]
+        if summary:
+            pipeline += [{"$project": ORDER_SUMMARY_PROJECTION}, ORDER_SUMMARY_ID_STAGE]
+            return await _list_response(collection, pipeline, limit, stream)
+        pipeline.append(ORDER_ID_STAGE)
+        return await _list_response(collection, pipeline, limit, stream)
     except Exception as e:
         logger.error(f"Error fetching orders: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -153,30 +205,31 @@ async def get_courses(
     instructor: Optional[str] = None,
     active_only: bool = True,
     limit: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    stream: bool = False,
+    summary: bool = False
 ):
-    """Get courses with optional filtering."""
+    """Get courses with optional filtering. Set stream to receive NDJSON.
+
+    Set summary to return only the listing fields (see CourseSummary).
+    """
     try:
         collection = get_collection(Collections.COURSES)
         
         # Build query
-        query = {}
-        if category:
-            query["category"] = category
-        if instructor:
-            query["instructor"] = instructor
-        if active_only:
-            query["is_active"] = True
-        
-        # Execute query
-        cursor = collection.find(query).skip(skip).limit(limit)
-        courses = await cursor.to_list(length=limit)
-        
-        # Convert ObjectId to string
-        for course in courses:
-            course["_id"] = str(course["_id"])
+        query = _build_query(
+            ("category", category or None),
+            ("instructor", instructor or None),
+            ("is_active", True if active_only else None)
+        )
         
-        return courses
+        # Execute query, converting ObjectIds to strings server-side
+        pipeline = [{"$match": query}, {"$skip": skip}, {"$limit": limit}]
+        if summary:
+            pipeline += [{"$project": COURSE_SUMMARY_PROJECTION}, COURSE_ID_STAGE]
+            return await _list_response(collection, pipeline, limit, stream)
+        pipeline.append(COURSE_ID_STAGE)
+        return await _list_response(collection, pipeline, limit, stream)
     except Exception as e:
         logger.error(f"Error fetching courses: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -189,34 +242,30 @@ async def get_classes(
     instructor: Optional[str] = None,
     upcoming_only: bool = True,
     limit: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    stream: bool = False
 ):
-    """Get classes with optional filtering."""
+    """Get classes with optional filtering. Set stream to receive NDJSON."""
     try:
-        from bson import ObjectId
-        from datetime import datetime
         collection = get_collection(Collections.CLASSES)
         
         # Build query
-        query = {}
-        if course_id:
-            query["course_id"] = ObjectId(course_id)
-        if instructor:
-            query["instructor"] = instructor
-        if upcoming_only:
-            query["schedule"] = {"$gte": datetime.utcnow()}
-            query["is_cancelled"] = False
-        
-        # Execute query
-        cursor = collection.find(query).sort("schedule", 1).skip(skip).limit(limit)
-        classes = await cursor.to_list(length=limit)
-        
-        # Convert ObjectId to string and format dates
-        for class_item in classes:
-            class_item["_id"] = str(class_item["_id"])
-            class_item["course_id"] = str(class_item["course_id"])
+        query = _build_query(
+            ("course_id", ObjectId(course_id) if course_id else None),
+            ("instructor", instructor or None),
+            ("schedule", {"$gte": datetime.now(timezone.utc)} if upcoming_only else None),
+            ("is_cancelled", False if upcoming_only else None)
+        )
         
-        return classes
+        # Execute query, converting ObjectIds to strings server-side
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"schedule": 1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            CLASS_ID_STAGE
+        ]
+        return await _list_response(collection, pipeline, limit, stream)
     except Exception as e:
         logger.error(f"Error fetching classes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -227,78 +276,100 @@ async def get_classes(
 async def get_revenue_metrics():
     """Get revenue analytics."""
     try:
-        from datetime import datetime, timedelta
-        orders_collection = get_collection(Collections.ORDERS)
-        payments_collection = get_collection(Collections.PAYMENTS)
-        
-        # Current month revenue
-        current_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        total_revenue_pipeline = [
-            {"$match": {"status": "paid"}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        
-        monthly_revenue_pipeline = [
-            {"$match": {
-                "status": "paid",
-                "paid_date": {"$gte": current_month_start}
-            }},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        
-        outstanding_pipeline = [
-            {"$match": {"status": "pending"}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        
-        total_revenue = await orders_collection.aggregate(total_revenue_pipeline).to_list(1)
-        monthly_revenue = await orders_collection.aggregate(monthly_revenue_pipeline).to_list(1)
-        outstanding = await orders_collection.aggregate(outstanding_pipeline).to_list(1)
-        
-        return {
-            "total_revenue": total_revenue[0]["total"] if total_revenue else 0,
-            "monthly_revenue": monthly_revenue[0]["total"] if monthly_revenue else 0,
-            "outstanding_payments": outstanding[0]["total"] if outstanding else 0,
-            "period": current_month_start.strftime("%Y-%m")
-        }
+        return await cached(
+            minute_bucket_key("analytics:revenue"),
+            get_settings().analytics_cache_ttl,
+            _compute_revenue_metrics
+        )
     except Exception as e:
         logger.error(f"Error fetching revenue metrics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _compute_revenue_metrics() -> dict:
+    """Aggregate revenue metrics from the orders collection."""
+    orders_collection = get_collection(Collections.ORDERS)
+    payments_collection = get_collection(Collections.PAYMENTS)
+    
+    # Current month revenue
+    current_month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    
+    # Single pass over paid/pending orders computing all three totals
+    revenue_pipeline = [
+        {"$match": {"status": {"$in": ["paid", "pending"]}}},
+        {"$facet": {
+            "total": [
+                {"$match": {"status": "paid"}},
+                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+            ],
+            "monthly": [
+                {"$match": {
+                    "status": "paid",
+                    "paid_date": {"$gte": current_month_start}
+                }},
+                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+            ],
+            "outstanding": [
+                {"$match": {"status": "pending"}},
+                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+            ]
+        }}
+    ]
+    
+    result = await orders_collection.aggregate(revenue_pipeline).to_list(1)
+    facets = result[0] if result else {}
+    total_revenue = facets.get("total")
+    monthly_revenue = facets.get("monthly")
+    outstanding = facets.get("outstanding")
+    
+    return {
+        "total_revenue": total_revenue[0]["total"] if total_revenue else 0,
+        "monthly_revenue": monthly_revenue[0]["total"] if monthly_revenue else 0,
+        "outstanding_payments": outstanding[0]["total"] if outstanding else 0,
+        "period": current_month_start.strftime("%Y-%m")
+    }
+
+
 @router.get("/analytics/clients", response_model=dict)
 async def get_client_metrics():
     """Get client analytics."""
     try:
-        from datetime import datetime, timedelta
-        collection = get_collection(Collections.CLIENTS)
-        
-        # Client status counts
-        status_pipeline = [
-            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-        ]
-        
-        # New clients this month
-        current_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        new_clients_pipeline = [
-            {"$match": {"registration_date": {"$gte": current_month_start}}},
-            {"$count": "new_clients"}
-        ]
-        
-        status_counts = await collection.aggregate(status_pipeline).to_list(10)
-        new_clients = await collection.aggregate(new_clients_pipeline).to_list(1)
-        
-        # Format status counts
-        status_dict = {item["_id"]: item["count"] for item in status_counts}
-        
-        return {
-            "active_clients": status_dict.get("active", 0),
-            "inactive_clients": status_dict.get("inactive", 0),
-            "suspended_clients": status_dict.get("suspended", 0),
-            "new_clients_this_month": new_clients[0]["new_clients"] if new_clients else 0,
-            "total_clients": sum(status_dict.values())
-        }
+        return await cached(
+            minute_bucket_key("analytics:clients"),
+            get_settings().analytics_cache_ttl,
+            _compute_client_metrics
+        )
     except Exception as e:
         logger.error(f"Error fetching client metrics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _compute_client_metrics() -> dict:
+    """Aggregate client metrics from the clients collection."""
+    collection = get_collection(Collections.CLIENTS)
+    
+    # Client status counts
+    status_pipeline = [
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]
+    
+    # New clients this month
+    current_month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    new_clients_pipeline = [
+        {"$match": {"registration_date": {"$gte": current_month_start}}},
+        {"$count": "new_clients"}
+    ]
+    
+    status_counts = await collection.aggregate(status_pipeline).to_list(10)
+    new_clients = await collection.aggregate(new_clients_pipeline).to_list(1)
+    
+    # Format status counts
+    status_dict = {item["_id"]: item["count"] for item in status_counts}
+    
+    return {
+        "active_clients": status_dict.get("active", 0),
+        "inactive_clients": status_dict.get("inactive", 0),
+        "suspended_clients": status_dict.get("suspended", 0),
+        "new_clients_this_month": new_clients[0]["new_clients"] if new_clients else 0,
+        "total_clients": sum(status_dict.values())
+    }
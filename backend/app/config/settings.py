@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
-from typing import Optional
+from typing import Optional, List
+from functools import lru_cache
 import os
 
 
@@ -19,23 +20,32 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # CORS Configuration
+    allowed_origins: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
+    allowed_methods: List[str] = ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
+    allowed_headers: List[str] = ["Content-Type", "Authorization", "Accept"]
+    
     # OpenAI Configuration (for CrewAI)
     openai_api_key: Optional[str] = None
     openai_model: str = "deepseek-chat"
+    openai_batch_model: Optional[str] = None  # Model for Batch API submissions, defaults to openai_model
+    openai_max_concurrency: int = 20  # Concurrent crew kickoffs allowed per process
+    openai_rpm_limit: Optional[int] = None  # Requests per minute cap applied to each crew
     
     # External API Configuration (MISSING FIELDS - ADDING NOW)
     external_api_base_url: str = "https://api.example.com"
     external_api_key: str = "your_external_api_key_here"
     
     # Application Configuration (MISSING FIELD - ADDING NOW)
-    debug: bool = True
+    debug: bool = False  # Development only: verbose agents and auto-reload
     
-    # Crew Configuration
-    crew_verbose: bool = True
-    crew_memory: bool = True
+    # Crew Configuration (verbose logging and agent memory add per-request overhead)
+    crew_verbose: bool = False
+    crew_memory: bool = False
     
     # External Services (Bonus Features)
     redis_url: Optional[str] = "redis://localhost:6379"
+    analytics_cache_ttl: int = 60  # Seconds analytics responses stay cached in Redis
     translation_service_url: Optional[str] = None
     
     # Logging
@@ -49,9 +59,7 @@ class Settings(BaseSettings):
     )
 
 
-# Global settings instance
-settings = Settings()
-
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Get application settings."""
-    return settings
\ No newline at end of file
+    """Get application settings, loaded once on first use."""
+    return Settings()
@@ -1,15 +1,19 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 import os
+from typing import List
 from dotenv import load_dotenv
 
-from .models.database import DatabaseManager, create_indexes
+from .models.database import connect_to_mongo, close_mongo_connection, create_indexes
 from .models.schemas import QueryRequest, QueryResponse, ErrorResponse, CreateClientRequest, CreateOrderRequest
 from .agents.crew_manager import CrewManager
 from .api.routes import router
 from .config.settings import get_settings
+from .utils.cache import CacheManager
+from .utils.collection_cache import start_collection_caches, stop_collection_caches
 
 # Load environment variables
 load_dotenv()
@@ -37,12 +41,17 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Fitness Studio Agent System...")
     
     # Connect to databases
-    await DatabaseManager.connect_to_mongo()
-    DatabaseManager.connect_to_mongo_sync()
+    await connect_to_mongo()
     
     # Create database indexes
     await create_indexes()
     
+    # Keep courses cached in-process
+    start_collection_caches()
+    
+    # Connect to response cache
+    await CacheManager.connect_to_redis()
+    
     # Initialize crew manager
     crew_manager = CrewManager()
     
@@ -52,8 +61,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down...")
-    await DatabaseManager.close_mongo_connection()
-    DatabaseManager.close_mongo_connection_sync()
+    await stop_collection_caches()
+    await close_mongo_connection()
+    await CacheManager.close_redis_connection()
     logger.info("Shutdown complete!")
 
 
@@ -62,21 +72,18 @@ app = FastAPI(
     title=settings.api_title,
     description=settings.api_description,
     version=settings.api_version,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
+# Add CORS middleware with explicit allow-lists; a wildcard origin is not
+# valid together with credentials
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "*"  # Allow all origins for development (remove in production)
-    ],
+    allow_origins=list(dict.fromkeys(settings.allowed_origins)),
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-    allow_headers=[
-        "*",
-    ],
-    expose_headers=["*"],
+    allow_methods=settings.allowed_methods,
+    allow_headers=settings.allowed_headers,
 )
 
 # Include API routes
@@ -131,6 +138,32 @@ async def support_query(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/v1/support/batch", response_model=List[QueryResponse])
+async def support_batch_query(requests: List[QueryRequest]):
+    """Handle a batch of support agent queries concurrently."""
+    try:
+        if crew_manager is None:
+            raise HTTPException(status_code=503, detail="System not ready")
+        
+        responses = await crew_manager.handle_support_batch(requests)
+        
+        return [
+            QueryResponse(
+                response=response["response"],
+                data=response.get("data"),
+                context=response.get("context"),
+                language=response.get("language")
+            )
+            for response in responses
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Support batch query error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/v1/dashboard", response_model=QueryResponse)
 async def dashboard_query(request: QueryRequest):
     """Handle dashboard agent queries."""
@@ -141,7 +174,8 @@ async def dashboard_query(request: QueryRequest):
         response = await crew_manager.handle_dashboard_query(
             query=request.query,
             language=request.language,
-            context=request.context
+            context=request.context,
+            batch_mode=request.batch_mode
         )
         
         return QueryResponse(
@@ -169,12 +203,43 @@ async def dashboard_query(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/v1/results/{batch_id}", response_model=QueryResponse)
+async def batch_result(batch_id: str):
+    """Get the result of a query submitted in batch mode."""
+    try:
+        if crew_manager is None:
+            raise HTTPException(status_code=503, detail="System not ready")
+        
+        response = await crew_manager.get_batch_result(batch_id)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        
+        return QueryResponse(
+            response=response["response"],
+            data=response.get("data"),
+            context=response.get("context"),
+            language=response.get("language")
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch result error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
+    # uvicorn's "auto" loop picks uvloop when it is installed and falls back
+    # to asyncio otherwise (uvloop is not available on Windows)
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="auto",
+        http="httptools",
+        # Auto-reload only in debug; otherwise run one worker per CPU
+        reload=settings.debug,
+        workers=1 if settings.debug else os.cpu_count(),
         log_level="info"
     )
@@ -1,78 +1,141 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from __future__ import annotations
+
 import os
-from typing import Optional
+import asyncio
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
 
 logger = logging.getLogger(__name__)
 
 
-class DatabaseManager:
+@lru_cache(maxsize=None)
+def _env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read an environment variable once; later calls return the cached value.
+
+    Resolved on first use rather than at import, because main loads .env after
+    importing this module. Call _env.cache_clear() to re-read.
+    """
+    return os.getenv(name, default)
+
+
+@dataclass(slots=True)
+class _DBState:
     client: Optional[AsyncIOMotorClient] = None
-    sync_client: Optional[MongoClient] = None
-    database = None
-    sync_database = None
+    database: Any = None
+    # Event loop the client runs on; blocking callers submit work to it via run_sync
+    loop: Optional[asyncio.AbstractEventLoop] = None
+    # Collection handles by name, reset whenever the connection changes
+    collections: Dict[str, Any] = field(default_factory=dict)
+
+
+# Connection state for this process
+_STATE = _DBState()
+
+
+async def connect_to_mongo():
+    """Create async database connection."""
+    # Imported here so entrypoints that never touch the database skip motor/pymongo
+    from motor.motor_asyncio import AsyncIOMotorClient
+    
+    logger.info("Connecting to MongoDB (async)...")
+    connection_string = DatabaseManager.get_connection_string()
+    database_name = DatabaseManager.get_database_name()
+    
+    _STATE.client = AsyncIOMotorClient(connection_string, **DatabaseManager.get_pool_options())
+    _STATE.database = _STATE.client[database_name]
+    _STATE.loop = asyncio.get_running_loop()
+    _STATE.collections.clear()
+    logger.info(f"Connected to MongoDB database: {database_name}")
+
+
+async def close_mongo_connection():
+    """Close async database connection."""
+    if _STATE.client:
+        _STATE.client.close()
+        _STATE.client = None
+        _STATE.database = None
+        _STATE.loop = None
+        _STATE.collections.clear()
+        logger.info("Disconnected from MongoDB (async)")
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Get async client instance, e.g. to start a session."""
+    if _STATE.client is None:
+        raise RuntimeError("Database not connected. Call connect_to_mongo first.")
+    return _STATE.client
+
+
+def get_database():
+    """Get async database instance."""
+    if _STATE.database is None:
+        raise RuntimeError("Database not connected. Call connect_to_mongo first.")
+    return _STATE.database
+
+
+class DatabaseManager:
+    """Connection settings, plus shims over the module-level connection functions."""
 
     @classmethod
     def get_connection_string(cls) -> str:
         """Get MongoDB connection string from environment variables."""
-        mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-        return mongodb_url
+        return _env("MONGODB_URL", "mongodb://localhost:27017")
 
     @classmethod
     def get_database_name(cls) -> str:
         """Get database name from environment variables."""
-        return os.getenv("DATABASE_NAME", "fitness_studio")
+        return _env("DATABASE_NAME", "fitness_studio")
 
     @classmethod
-    async def connect_to_mongo(cls):
-        """Create async database connection."""
-        logger.info("Connecting to MongoDB (async)...")
-        connection_string = cls.get_connection_string()
-        database_name = cls.get_database_name()
-        
-        cls.client = AsyncIOMotorClient(connection_string)
-        cls.database = cls.client[database_name]
-        logger.info(f"Connected to MongoDB database: {database_name}")
+    def get_pool_options(cls) -> dict:
+        """Get connection pool options from environment variables."""
+        return {
+            "maxPoolSize": int(_env("MONGODB_MAX_POOL_SIZE", "50")),
+            "minPoolSize": int(_env("MONGODB_MIN_POOL_SIZE", "5")),
+            "maxIdleTimeMS": int(_env("MONGODB_MAX_IDLE_TIME_MS", "60000")),
+            "waitQueueTimeoutMS": int(_env("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2500")),
+            "serverSelectionTimeoutMS": int(_env("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "3000")),
+            "retryWrites": True,
+            # Read datetimes back as aware UTC, matching the values the app writes
+            "tz_aware": True,
+        }
 
     @classmethod
-    def connect_to_mongo_sync(cls):
-        """Create sync database connection for tools."""
-        logger.info("Connecting to MongoDB (sync)...")
-        connection_string = cls.get_connection_string()
-        database_name = cls.get_database_name()
-        
-        cls.sync_client = MongoClient(connection_string)
-        cls.sync_database = cls.sync_client[database_name]
-        logger.info(f"Connected to MongoDB database (sync): {database_name}")
+    async def connect_to_mongo(cls):
+        """Create async database connection."""
+        await connect_to_mongo()
 
     @classmethod
     async def close_mongo_connection(cls):
         """Close async database connection."""
-        if cls.client:
-            cls.client.close()
-            logger.info("Disconnected from MongoDB (async)")
-
-    @classmethod
-    def close_mongo_connection_sync(cls):
-        """Close sync database connection."""
-        if cls.sync_client:
-            cls.sync_client.close()
-            logger.info("Disconnected from MongoDB (sync)")
+        await close_mongo_connection()
 
     @classmethod
     def get_database(cls):
         """Get async database instance."""
-        if cls.database is None:
-            raise RuntimeError("Database not connected. Call connect_to_mongo first.")
-        return cls.database
+        return get_database()
 
-    @classmethod
-    def get_sync_database(cls):
-        """Get sync database instance."""
-        if cls.sync_database is None:
-            raise RuntimeError("Sync database not connected. Call connect_to_mongo_sync first.")
-        return cls.sync_database
+
+def install_uvloop() -> bool:
+    """Use uvloop for event loops created after this call, if it is installed.
+
+    Must run before the loop starts (i.e. before asyncio.run or uvicorn), so it
+    belongs in entrypoints rather than connect_to_mongo. All Motor I/O then runs
+    on uvloop instead of asyncio's default selector loop.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logger.info("uvloop not installed, using the default asyncio event loop")
+        return False
+    
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
 
 
 # Database collections
@@ -83,58 +146,231 @@ class Collections:
     COURSES = "courses"
     CLASSES = "classes"
     ATTENDANCE = "attendance"
+    AGENT_BATCHES = "agent_batches"
+
+
+# Case-insensitive collation for name lookups; queries must pass the same
+# collation to use the indexes built with it
+CASE_INSENSITIVE_COLLATION = {"locale": "en", "strength": 2}
+
+
+# Set once create_indexes has run in this process
+_indexes_created = False
 
 
 # Helper functions for database operations
 def get_collection(collection_name: str):
-    """Get async collection instance."""
-    db = DatabaseManager.get_database()
-    return db[collection_name]
-
+    """Get async collection instance, reusing the handle for this connection."""
+    collection = _STATE.collections.get(collection_name)
+    if collection is None:
+        collection = _STATE.collections[collection_name] = get_database()[collection_name]
+    return collection
 
-def get_sync_collection(collection_name: str):
-    """Get sync collection instance."""
-    db = DatabaseManager.get_sync_database()
-    return db[collection_name]
 
+def run_sync(coro):
+    """Run a coroutine on the database event loop from a worker thread and wait for the result.
 
-async def create_indexes():
-    """Create database indexes for optimal performance."""
-    db = DatabaseManager.get_database()
+    Blocking callers such as the CrewAI tools run in worker threads (crew kickoffs
+    and tool calls from routes go through asyncio.to_thread), so their queries use
+    the shared Motor client instead of a separate synchronous one.
+    """
+    loop = _STATE.loop
+    if loop is None:
+        coro.close()
+        raise RuntimeError("Database not connected. Call connect_to_mongo first.")
+    
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        coro.close()
+        raise RuntimeError("run_sync would deadlock when called from the event loop thread.")
     
-    # Clients indexes
-    await db[Collections.CLIENTS].create_index([("email", 1)], unique=True)
-    await db[Collections.CLIENTS].create_index([("phone", 1)])
-    await db[Collections.CLIENTS].create_index([("name", "text"), ("email", "text")])
-    await db[Collections.CLIENTS].create_index([("status", 1)])
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def bulk_ingest(collection_name: str, docs: List[Dict[str, Any]]):
+    """Load a large batch of documents with the collection's indexes dropped.
+
+    Drops every index on the collection, inserts the documents unordered, then
+    rebuilds the collection's indexes from _index_models(), so index maintenance
+    is paid once instead of per document. Uniqueness is not enforced while the
+    indexes are gone; rebuilding a unique index fails if the batch had duplicates.
+    Only for one-shot imports and backfills, never for operational writes.
+    """
+    collection = get_collection(collection_name)
+    await collection.drop_indexes()
+    try:
+        if docs:
+            await collection.insert_many(docs, ordered=False)
+    finally:
+        indexes = _index_models().get(collection_name)
+        if indexes:
+            await collection.create_indexes(indexes)
+        logger.info(f"Bulk ingested {len(docs)} documents into {collection_name}")
+
+
+def _retention_seconds(name: str, default: Optional[str] = None) -> Optional[int]:
+    """A *_RETENTION_DAYS environment variable in seconds, or None to keep records."""
+    retention_days = _env(name, default)
+    return int(retention_days) * 86400 if retention_days else None
+
+
+# TTL indexes as (collection, field) -> retention setting; _index_models builds
+# them and _reconcile_ttl_indexes keeps existing ones in line with the setting
+TTL_INDEXES = {
+    (Collections.ATTENDANCE, "date"): ("ATTENDANCE_RETENTION_DAYS", None),
+    # Batch records are only read while a client polls for the result
+    (Collections.AGENT_BATCHES, "created_date"): ("AGENT_BATCH_RETENTION_DAYS", "7"),
+}
+
+
+def _ttl_options(collection_name: str, field: str) -> dict:
+    """expireAfterSeconds for a TTL index, or no options when retention is unset."""
+    ttl_seconds = _retention_seconds(*TTL_INDEXES[(collection_name, field)])
+    return {"expireAfterSeconds": ttl_seconds} if ttl_seconds is not None else {}
+
+
+def _index_models() -> dict:
+    """Indexes per collection, created with one createIndexes command each."""
+    from pymongo import IndexModel
     
-    # Orders indexes
-    await db[Collections.ORDERS].create_index([("client_id", 1)])
-    await db[Collections.ORDERS].create_index([("status", 1)])
-    await db[Collections.ORDERS].create_index([("created_date", -1)])
-    await db[Collections.ORDERS].create_index([("service_type", 1), ("service_id", 1)])
+    return {
+        Collections.CLIENTS: [
+            IndexModel([("email", 1)], unique=True, background=True),
+            IndexModel([("phone", 1)], background=True),
+            # Word search on names; emails are matched by prefix on email_1 instead,
+            # since the text index tokenizes them into meaningless fragments
+            IndexModel([("name", "text")], background=True),
+            # Partial-name (prefix) search
+            IndexModel([("name", 1)], background=True),
+            IndexModel([("status", 1)], background=True),
+        ],
+        Collections.ORDERS: [
+            IndexModel([("created_date", -1)], background=True),
+            IndexModel([("service_type", 1), ("service_id", 1)], background=True),
+            IndexModel([("client_id", 1), ("status", 1), ("created_date", -1)], background=True),
+            # A client's orders newest first when no status filter is given
+            IndexModel([("client_id", 1), ("created_date", -1)], background=True),
+            IndexModel([("status", 1), ("created_date", -1)], background=True),
+        ],
+        Collections.PAYMENTS: [
+            IndexModel([("order_id", 1)], background=True),
+            IndexModel([("status", 1), ("payment_date", -1)], background=True),
+            IndexModel([("payment_date", -1)], background=True),
+        ],
+        Collections.COURSES: [
+            IndexModel([("name", "text"), ("description", "text")], background=True),
+            IndexModel([("instructor", 1)], background=True),
+            # Active courses by enrollment (service analytics' top courses); also serves is_active alone
+            IndexModel([("is_active", 1), ("enrollment_count", -1)], background=True),
+            IndexModel([("category", 1), ("instructor", 1), ("is_active", 1)], background=True),
+            IndexModel([("name", 1)], collation=CASE_INSENSITIVE_COLLATION, background=True),
+        ],
+        Collections.CLASSES: [
+            IndexModel([("instructor", 1)], background=True),
+            # Equality fields before the schedule range/sort field
+            IndexModel([("course_id", 1), ("is_cancelled", 1), ("schedule", 1)], background=True),
+            IndexModel([("is_cancelled", 1), ("schedule", 1)], background=True),
+            IndexModel([("course_name", 1)], collation=CASE_INSENSITIVE_COLLATION, background=True),
+        ],
+        Collections.ATTENDANCE: [
+            IndexModel([("class_id", 1), ("client_id", 1)], unique=True, background=True),
+            # A class's attendance newest first
+            IndexModel([("class_id", 1), ("date", -1)], background=True),
+            # Covers attendance-history queries (filter by client, sort by date, read status)
+            IndexModel([("client_id", 1), ("date", -1), ("status", 1)], background=True),
+            # Doubles as a TTL index when ATTENDANCE_RETENTION_DAYS is set
+            IndexModel([("date", 1)], background=True, **_ttl_options(Collections.ATTENDANCE, "date")),
+            IndexModel([("status", 1)], background=True),
+        ],
+        Collections.AGENT_BATCHES: [
+            IndexModel([("batch_id", 1)], unique=True, background=True),
+            # Expire batch records after AGENT_BATCH_RETENTION_DAYS
+            IndexModel([("created_date", 1)], background=True, **_ttl_options(Collections.AGENT_BATCHES, "created_date")),
+        ],
+    }
+
+
+# Indexes superseded by those in _index_models() (prefixes of compound indexes,
+# or replaced specs); they only cost RAM and write amplification, so drop them
+OBSOLETE_INDEXES = {
+    Collections.CLIENTS: ["name_text_email_text"],
+    Collections.ORDERS: ["client_id_1", "status_1"],
+    Collections.PAYMENTS: ["status_1"],
+    Collections.COURSES: ["category_1", "is_active_1"],
+    Collections.CLASSES: ["course_id_1", "schedule_1", "is_cancelled_1"],
+    Collections.ATTENDANCE: ["client_id_1", "client_id_1_date_-1", "date_-1"],
+}
+
+
+async def _drop_obsolete_indexes(db):
+    """Drop superseded indexes left behind by earlier versions."""
+    for collection_name, index_names in OBSOLETE_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for index_name in index_names:
+            if index_name in existing:
+                await db[collection_name].drop_index(index_name)
+                logger.info(f"Dropped obsolete index {collection_name}.{index_name}")
+
+
+async def _reconcile_ttl_indexes(db):
+    """Align existing TTL indexes with their configured retention.
+
+    createIndexes fails with IndexOptionsConflict when an index exists with a
+    different expireAfterSeconds, so change it in place with collMod, or drop it
+    to be recreated when the TTL is removed (or collMod cannot convert it).
+    """
+    from pymongo.errors import OperationFailure
     
-    # Payments indexes
-    await db[Collections.PAYMENTS].create_index([("order_id", 1)])
-    await db[Collections.PAYMENTS].create_index([("status", 1)])
-    await db[Collections.PAYMENTS].create_index([("payment_date", -1)])
+    for (collection_name, field) in TTL_INDEXES:
+        collection = db[collection_name]
+        index_name = f"{field}_1"
+        existing = (await collection.index_information()).get(index_name)
+        desired = _ttl_options(collection_name, field).get("expireAfterSeconds")
+        if existing is None or existing.get("expireAfterSeconds") == desired:
+            continue
+        
+        if desired is not None:
+            try:
+                await db.command(
+                    "collMod", collection_name,
+                    index={"keyPattern": {field: 1}, "expireAfterSeconds": desired}
+                )
+                logger.info(f"Set {collection_name}.{index_name} TTL to {desired} seconds")
+                continue
+            except OperationFailure as e:
+                # Older servers cannot turn a plain index into a TTL index
+                logger.info(f"collMod on {collection_name}.{index_name} failed, recreating it: {e}")
+        
+        await collection.drop_index(index_name)
+        logger.info(f"Dropped {collection_name}.{index_name} to recreate it with the configured TTL")
+
+
+async def create_indexes():
+    """Create database indexes for optimal performance.
+
+    Each collection's indexes are sent as one createIndexes command, and the
+    collections are processed concurrently. They run once per process;
+    existing indexes are left untouched apart from TTL_INDEXES, which follow
+    their retention settings. Obsolete indexes are dropped first,
+    since a replaced text index would otherwise block its successor (MongoDB
+    allows one text index per collection).
+    """
+    global _indexes_created
+    if _indexes_created:
+        return
     
-    # Courses indexes
-    await db[Collections.COURSES].create_index([("name", "text"), ("description", "text")])
-    await db[Collections.COURSES].create_index([("instructor", 1)])
-    await db[Collections.COURSES].create_index([("category", 1)])
-    await db[Collections.COURSES].create_index([("is_active", 1)])
+    db = get_database()
     
-    # Classes indexes
-    await db[Collections.CLASSES].create_index([("course_id", 1)])
-    await db[Collections.CLASSES].create_index([("instructor", 1)])
-    await db[Collections.CLASSES].create_index([("schedule", 1)])
-    await db[Collections.CLASSES].create_index([("is_cancelled", 1)])
+    await _drop_obsolete_indexes(db)
+    await _reconcile_ttl_indexes(db)
     
-    # Attendance indexes
-    await db[Collections.ATTENDANCE].create_index([("class_id", 1), ("client_id", 1)], unique=True)
-    await db[Collections.ATTENDANCE].create_index([("client_id", 1)])
-    await db[Collections.ATTENDANCE].create_index([("date", -1)])
-    await db[Collections.ATTENDANCE].create_index([("status", 1)])
+    await asyncio.gather(*(
+        db[collection_name].create_indexes(indexes)
+        for collection_name, indexes in _index_models().items()
+    ))
     
+    _indexes_created = True
     logger.info("Database indexes created successfully")
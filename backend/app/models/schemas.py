@@ -1,30 +1,49 @@
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from pydantic.json_schema import JsonSchemaValue
-from pydantic_core import core_schema
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from pydantic import (
+    BaseModel, Field, EmailStr, ConfigDict, AfterValidator,
+    PlainSerializer, PlainValidator, WithJsonSchema
+)
+from typing import Optional, List, Dict, Any, Annotated
+from datetime import datetime, timezone
 from enum import Enum
 from bson import ObjectId
+from bson.errors import InvalidId
+import re
 
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_pydantic_core_schema__(
-        cls, source_type: Any, handler
-    ) -> core_schema.CoreSchema:
-        return core_schema.no_info_plain_validator_function(cls.validate)
+def _to_object_id(value: Any) -> ObjectId:
+    # Documents read from MongoDB already hold ObjectIds; only parse strings
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise ValueError("Invalid ObjectId")
 
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
 
-    @classmethod
-    def __get_pydantic_json_schema__(
-        cls, core_schema: core_schema.CoreSchema, handler
-    ) -> JsonSchemaValue:
-        return {"type": "string"}
+PyObjectId = Annotated[
+    ObjectId,
+    PlainValidator(_to_object_id),
+    PlainSerializer(str, when_used="json"),
+    WithJsonSchema({"type": "string"}),
+]
+
+
+# E.164 phone number, compiled once and shared by every model with a phone field
+_PHONE_RE = re.compile(r"\+?[1-9]\d{1,14}")
+
+
+def _validate_phone(value: str) -> str:
+    if not _PHONE_RE.fullmatch(value):
+        raise ValueError("Invalid phone number")
+    return value
+
+
+PhoneNumber = Annotated[str, AfterValidator(_validate_phone)]
+
+
+def _now() -> datetime:
+    """Current UTC time; BSON stores it as UTC either way."""
+    return datetime.now(timezone.utc)
 
 
 class ClientStatus(str, Enum):
@@ -56,13 +75,13 @@ class AttendanceStatus(str, Enum):
 
 # Client Models
 class Client(BaseModel):
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     name: str = Field(..., min_length=1, max_length=100)
     email: EmailStr
-    phone: str = Field(..., pattern=r"^\+?[1-9]\d{1,14}$")
+    phone: PhoneNumber
     status: ClientStatus = ClientStatus.ACTIVE
     enrolled_services: List[str] = Field(default_factory=list)
-    registration_date: datetime = Field(default_factory=datetime.utcnow)
+    registration_date: datetime = Field(default_factory=_now)
     birthday: Optional[datetime] = None
     last_activity: Optional[datetime] = None
     address: Optional[str] = None
@@ -70,22 +89,20 @@ class Client(BaseModel):
     notes: Optional[str] = None
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str}
+        populate_by_name=True
     )
 
 
 # Order Models
 class Order(BaseModel):
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     client_id: PyObjectId
     service_type: str  # "course" or "class"
     service_id: PyObjectId
     service_name: str
     amount: float = Field(..., gt=0)
     status: OrderStatus = OrderStatus.PENDING
-    created_date: datetime = Field(default_factory=datetime.utcnow)
+    created_date: datetime = Field(default_factory=_now)
     due_date: Optional[datetime] = None
     paid_date: Optional[datetime] = None
     discount_applied: Optional[float] = 0.0
@@ -93,18 +110,30 @@ class Order(BaseModel):
     notes: Optional[str] = None
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str}
+        populate_by_name=True
+    )
+
+
+class OrderSummary(BaseModel):
+    """Listing view of an order; load with ORDER_SUMMARY_PROJECTION."""
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
+    client_id: PyObjectId
+    service_name: str
+    amount: float
+    status: OrderStatus
+    created_date: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True
     )
 
 
 # Payment Models
 class Payment(BaseModel):
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     order_id: PyObjectId
     amount: float = Field(..., gt=0)
-    payment_date: datetime = Field(default_factory=datetime.utcnow)
+    payment_date: datetime = Field(default_factory=_now)
     method: str  # "cash", "card", "online", "bank_transfer"
     status: PaymentStatus = PaymentStatus.PENDING
     transaction_id: Optional[str] = None
@@ -112,15 +141,13 @@ class Payment(BaseModel):
     notes: Optional[str] = None
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str}
+        populate_by_name=True
     )
 
 
 # Course Models
 class Course(BaseModel):
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     name: str = Field(..., min_length=1, max_length=100)
     instructor: str = Field(..., min_length=1, max_length=100)
     description: str
@@ -133,18 +160,29 @@ class Course(BaseModel):
     difficulty_level: str  # "beginner", "intermediate", "advanced"
     prerequisites: List[str] = Field(default_factory=list)
     is_active: bool = True
-    created_date: datetime = Field(default_factory=datetime.utcnow)
+    created_date: datetime = Field(default_factory=_now)
+
+    model_config = ConfigDict(
+        populate_by_name=True
+    )
+
+
+class CourseSummary(BaseModel):
+    """Listing view of a course; load with COURSE_SUMMARY_PROJECTION."""
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
+    name: str
+    instructor: str
+    category: str
+    price: float
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str}
+        populate_by_name=True
     )
 
 
 # Class Models
 class Class(BaseModel):
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     course_id: PyObjectId
     course_name: str
     instructor: str
@@ -159,35 +197,37 @@ class Class(BaseModel):
     notes: Optional[str] = None
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str}
+        populate_by_name=True
     )
 
 
 # Attendance Models
 class Attendance(BaseModel):
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     class_id: PyObjectId
     client_id: PyObjectId
-    date: datetime = Field(default_factory=datetime.utcnow)
+    date: datetime = Field(default_factory=_now)
     status: AttendanceStatus = AttendanceStatus.PRESENT
     checked_in_time: Optional[datetime] = None
     checked_out_time: Optional[datetime] = None
     notes: Optional[str] = None
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str}
+        populate_by_name=True
     )
 
 
+# MongoDB projections matching the summary models
+COURSE_SUMMARY_PROJECTION = {"name": 1, "instructor": 1, "category": 1, "price": 1}
+ORDER_SUMMARY_PROJECTION = {"client_id": 1, "service_name": 1, "amount": 1, "status": 1, "created_date": 1}
+
+
 # API Request/Response Models
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1)
     language: Optional[str] = "en"
     context: Optional[Dict[str, Any]] = None
+    batch_mode: bool = False  # Submit via the provider Batch API and fetch the result later
 
 
 class QueryResponse(BaseModel):
@@ -200,13 +240,13 @@ class QueryResponse(BaseModel):
 class ErrorResponse(BaseModel):
     error: str
     details: Optional[Dict[str, Any]] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=_now)
 
 
 class CreateClientRequest(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     email: EmailStr
-    phone: str = Field(..., pattern=r"^\+?[1-9]\d{1,14}$")
+    phone: PhoneNumber
     birthday: Optional[datetime] = None
     address: Optional[str] = None
     emergency_contact: Optional[Dict[str, str]] = None
@@ -0,0 +1,41 @@
+"""
+Typed containers for documents the service keeps for internal use (caches,
+aggregations). Unlike the pydantic models in schemas.py they carry no
+validation state; convert to the pydantic models only at the API boundary.
+ObjectId fields keep their BSON type.
+"""
+
+import msgspec
+from bson import ObjectId
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+
+class CourseRow(msgspec.Struct, kw_only=True):
+    id: ObjectId = msgspec.field(name="_id")
+    name: str
+    instructor: str
+    description: str
+    duration_weeks: int
+    capacity: int
+    enrollment_count: int = 0
+    completion_rate: float = 0.0
+    price: float
+    category: str
+    difficulty_level: str
+    prerequisites: List[str] = []
+    is_active: bool = True
+    created_date: Optional[datetime] = None
+
+
+def _dec_hook(type_: type, obj: Any) -> Any:
+    # msgspec has no native ObjectId support; documents from MongoDB already hold them
+    if type_ is ObjectId:
+        return obj if isinstance(obj, ObjectId) else ObjectId(obj)
+    raise NotImplementedError(f"Unsupported type: {type_}")
+
+
+def to_row(doc: Dict[str, Any], row_type: type):
+    """Convert a MongoDB document to row_type."""
+    return msgspec.convert(doc, row_type, dec_hook=_dec_hook)
+
@@ -0,0 +1,30 @@
+"""
+msgspec encoding of trusted database documents on read endpoints, used to
+serialize them without going through pydantic. Documents are encoded as-is,
+so missing optional fields and extra fields pass through unchanged.
+"""
+
+import msgspec
+from bson import ObjectId
+from typing import List, Dict, Any
+
+
+def _enc_hook(obj: Any) -> Any:
+    """Encode BSON types msgspec does not know about."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise NotImplementedError(f"Cannot encode objects of type {type(obj).__name__}")
+
+
+# Shared encoder, reused across requests
+JSON_ENCODER = msgspec.json.Encoder(enc_hook=_enc_hook)
+
+
+def encode_documents(docs: List[Dict[str, Any]]) -> bytes:
+    """Encode trusted documents as a JSON array."""
+    return JSON_ENCODER.encode(docs)
+
+
+def encode_document(doc: Dict[str, Any]) -> bytes:
+    """Encode a trusted document as JSON."""
+    return JSON_ENCODER.encode(doc)
@@ -1,17 +1,235 @@
 from crewai.tools import BaseTool
-from typing import Optional, Dict, Any, List
-import json
-from datetime import datetime, timedelta
+import asyncio
+from typing import Optional, Dict, Any, ClassVar, List
+import orjson
+import re
+import msgspec
+from cachetools import TTLCache
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from bson import ObjectId
-from pymongo.errors import PyMongoError
+from pymongo.errors import OperationFailure, PyMongoError
 import logging
 
-from ..models.database import get_sync_collection, Collections
+from ..models.database import get_collection, Collections, run_sync
 from ..models.schemas import ClientStatus, OrderStatus, AttendanceStatus
+from ..utils.collection_cache import course_cache
 
 logger = logging.getLogger(__name__)
 
 
+def _dumps(payload: Dict[str, Any]) -> str:
+    """Serialize a tool response as indented JSON.
+
+    Datetimes are written as ISO strings natively and ObjectIds through
+    default=str, so query results need no per-document conversion first.
+    """
+    return orjson.dumps(payload, default=str, option=orjson.OPT_INDENT_2).decode()
+
+
+# Phrase matchers for _normalize_query_type, one alternation per category so each
+# category is a single scan. Categories are still tried in priority order.
+_FIND_CLIENTS_RE = re.compile("client search and management|recent clients|show clients|get clients|find clients")
+_GET_ORDERS_RE = re.compile("order and payment tracking|recent orders|show orders|get orders|find orders")
+_COURSES_RE = re.compile("course and class information|courses|classes")
+_ANALYTICS_RE = re.compile("revenue|analytics|statistics|summary")
+_SEARCH_RE = re.compile("search|find")
+
+# Fields returned by the listing queries; contact details, free-text notes and
+# raw gateway payloads stay on the server
+_CLIENT_PROJECTION = {
+    "name": 1, "email": 1, "phone": 1, "status": 1, "enrolled_services": 1,
+    "registration_date": 1, "birthday": 1, "last_activity": 1,
+}
+_ORDER_PROJECTION = {
+    "client_id": 1, "service_type": 1, "service_id": 1, "service_name": 1, "amount": 1,
+    "status": 1, "created_date": 1, "due_date": 1, "paid_date": 1,
+    "discount_applied": 1, "tax_amount": 1,
+}
+_PAYMENT_PROJECTION = {
+    "order_id": 1, "amount": 1, "payment_date": 1, "method": 1, "status": 1, "transaction_id": 1,
+}
+# The fields of the cached CourseRow, so cached and queried courses have the same shape
+_COURSE_PROJECTION = {
+    "name": 1, "instructor": 1, "description": 1, "duration_weeks": 1, "capacity": 1,
+    "enrollment_count": 1, "completion_rate": 1, "price": 1, "category": 1,
+    "difficulty_level": 1, "prerequisites": 1, "is_active": 1, "created_date": 1,
+}
+_CLASS_PROJECTION = {
+    "course_id": 1, "course_name": 1, "instructor": 1, "schedule": 1, "duration_minutes": 1,
+    "capacity": 1, "enrolled_count": 1, "room": 1,
+}
+_ATTENDANCE_PROJECTION = {
+    "class_id": 1, "client_id": 1, "date": 1, "status": 1, "checked_in_time": 1, "checked_out_time": 1,
+}
+
+# Cursor batch size for analytics queries that return one row per class; large
+# enough that typical results arrive without extra getMore round trips
+_ANALYTICS_BATCH_SIZE = 1000
+
+# Course fields reported in service analytics' top courses
+_TOP_COURSE_PROJECTION = {
+    "name": 1, "instructor": 1, "category": 1, "capacity": 1, "enrollment_count": 1, "completion_rate": 1,
+}
+
+# Class fields attendance analytics reports alongside each class's counts
+_ATTENDANCE_CLASS_PROJECTION = {"course_name": 1, "instructor": 1, "schedule": 1, "enrolled_count": 1}
+
+# Sort key for classes without a schedule; aware, like the datetimes read from MongoDB
+_NO_SCHEDULE = datetime.min.replace(tzinfo=timezone.utc)
+
+# Agents tend to repeat the same date-range strings; datetimes are immutable, so
+# parsed values can be shared
+_parse_iso_date = lru_cache(maxsize=1024)(datetime.fromisoformat)
+
+# Returned by the listing queries when the database is empty, for demo purposes
+_SAMPLE_CLIENTS = [
+    {
+        "_id": "sample001",
+        "name": "John Smith",
+        "email": "john.smith@email.com",
+        "phone": "+1-555-0101",
+        "status": "active",
+        "registration_date": "2024-01-15T09:00:00Z",
+        "membership_type": "Premium",
+        "last_activity": "2024-07-01T08:30:00Z"
+    },
+    {
+        "_id": "sample002", 
+        "name": "Sarah Johnson",
+        "email": "sarah.johnson@email.com",
+        "phone": "+1-555-0102",
+        "status": "active",
+        "registration_date": "2024-02-20T10:00:00Z",
+        "membership_type": "Basic",
+        "last_activity": "2024-06-30T18:00:00Z"
+    },
+    {
+        "_id": "sample003",
+        "name": "Mike Davis",
+        "email": "mike.davis@email.com", 
+        "phone": "+1-555-0103",
+        "status": "active",
+        "registration_date": "2024-06-25T14:00:00Z",
+        "membership_type": "Personal Training",
+        "last_activity": "2024-06-29T16:30:00Z"
+    },
+    {
+        "_id": "sample004",
+        "name": "Emily Wilson",
+        "email": "emily.wilson@email.com",
+        "phone": "+1-555-0104", 
+        "status": "active",
+        "registration_date": "2024-03-10T11:00:00Z",
+        "membership_type": "Premium",
+        "last_activity": "2024-06-28T07:45:00Z"
+    },
+    {
+        "_id": "sample005",
+        "name": "David Brown",
+        "email": "david.brown@email.com",
+        "phone": "+1-555-0105",
+        "status": "active", 
+        "registration_date": "2024-05-05T13:00:00Z",
+        "membership_type": "Basic",
+        "last_activity": "2024-06-27T19:15:00Z"
+    }
+]
+
+_SAMPLE_ORDERS = [
+    {
+        "_id": "order001",
+        "client_id": "sample001",
+        "client_name": "John Smith",
+        "service_name": "Personal Training Session",
+        "total_amount": 75.00,
+        "status": "confirmed",
+        "created_date": "2024-06-30T14:30:00Z",
+        "scheduled_date": "2024-07-02T09:00:00Z"
+    },
+    {
+        "_id": "order002",
+        "client_id": "sample002", 
+        "client_name": "Sarah Johnson",
+        "service_name": "Yoga Class Package (5 sessions)",
+        "total_amount": 125.00,
+        "status": "confirmed",
+        "created_date": "2024-06-29T16:45:00Z",
+        "scheduled_date": "2024-07-01T18:00:00Z"
+    },
+    {
+        "_id": "order003",
+        "client_id": "sample003",
+        "client_name": "Mike Davis",
+        "service_name": "HIIT Training Session",
+        "total_amount": 65.00,
+        "status": "pending",
+        "created_date": "2024-06-29T11:20:00Z",
+        "scheduled_date": "2024-07-03T07:00:00Z"
+    },
+    {
+        "_id": "order004",
+        "client_id": "sample004",
+        "client_name": "Emily Wilson", 
+        "service_name": "Pilates Session",
+        "total_amount": 80.00,
+        "status": "completed",
+        "created_date": "2024-06-28T13:15:00Z",
+        "scheduled_date": "2024-06-30T10:00:00Z",
+        "completed_date": "2024-06-30T11:00:00Z"
+    },
+    {
+        "_id": "order005",
+        "client_id": "sample005",
+        "client_name": "David Brown",
+        "service_name": "Strength Training Session", 
+        "total_amount": 70.00,
+        "status": "confirmed",
+        "created_date": "2024-06-27T09:30:00Z",
+        "scheduled_date": "2024-07-01T17:30:00Z"
+    }
+]
+
+_SAMPLE_DATA = {"clients": _SAMPLE_CLIENTS, "orders": _SAMPLE_ORDERS}
+
+
+@lru_cache(maxsize=32)
+def _sample_response(key: str, limit: int) -> str:
+    """Render the sample-data response for a listing; each limit is rendered once."""
+    samples = _SAMPLE_DATA[key]
+    return _dumps({
+        "success": True,
+        "count": len(samples),
+        key: samples[:limit],
+        "note": "Sample data - database appears to be empty"
+    })
+
+
+def _course_doc(row) -> Dict[str, Any]:
+    """A cached CourseRow as the document the projected courses query returns."""
+    doc = msgspec.structs.asdict(row)
+    return {"_id": doc.pop("id"), **doc}
+
+
+def _facet_count(facets: Dict[str, Any], name: str) -> int:
+    """Read a {"$count": "count"} facet; $count emits no document when nothing matched."""
+    result = facets[name]
+    return result[0]["count"] if result else 0
+
+
+# Look-back window per analytics period
+_PERIOD_DELTAS = {
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+    "quarter": timedelta(days=90),
+}
+
+# Rendered analytics responses, keyed by (query type, *params). Agents repeat the
+# same analytics queries often and the numbers may be up to the TTL old. Only
+# touched from the database event loop.
+_analytics_cache = TTLCache(maxsize=32, ttl=300)
+
+
 class MongoDBTool(BaseTool):
     name: str = "MongoDB Query Tool"
     description: str = """
@@ -27,6 +245,24 @@ class MongoDBTool(BaseTool):
     Use this tool for all database queries and analytics operations.
     """
 
+    # Normalized query type -> handler method name
+    _DISPATCH: ClassVar[Dict[str, str]] = {
+        "find_clients": "_find_clients",
+        "get_client_by_id": "_get_client_by_id",
+        "search_clients": "_search_clients",
+        "get_orders": "_get_orders",
+        "get_order_by_id": "_get_order_by_id",
+        "get_payments": "_get_payments",
+        "get_courses": "_get_courses",
+        "get_classes": "_get_classes",
+        "get_attendance": "_get_attendance",
+        "revenue_analytics": "_revenue_analytics",
+        "client_analytics": "_client_analytics",
+        "service_analytics": "_service_analytics",
+        "attendance_analytics": "_attendance_analytics",
+        "summary_statistics": "_get_summary_statistics",
+    }
+
     def _run(self, query_type: str, **kwargs) -> str:
         """
         Execute MongoDB operations based on query type.
@@ -39,36 +275,10 @@ class MongoDBTool(BaseTool):
             # Normalize the query type to handle natural language queries from agents
             normalized_query = self._normalize_query_type(query_type)
             
-            if normalized_query == "find_clients":
-                return self._find_clients(**kwargs)
-            elif normalized_query == "get_client_by_id":
-                return self._get_client_by_id(**kwargs)
-            elif normalized_query == "search_clients":
-                return self._search_clients(**kwargs)
-            elif normalized_query == "get_orders":
-                return self._get_orders(**kwargs)
-            elif normalized_query == "get_order_by_id":
-                return self._get_order_by_id(**kwargs)
-            elif normalized_query == "get_payments":
-                return self._get_payments(**kwargs)
-            elif normalized_query == "get_courses":
-                return self._get_courses(**kwargs)
-            elif normalized_query == "get_classes":
-                return self._get_classes(**kwargs)
-            elif normalized_query == "get_attendance":
-                return self._get_attendance(**kwargs)
-            elif normalized_query == "revenue_analytics":
-                return self._revenue_analytics(**kwargs)
-            elif normalized_query == "client_analytics":
-                return self._client_analytics(**kwargs)
-            elif normalized_query == "service_analytics":
-                return self._service_analytics(**kwargs)
-            elif normalized_query == "attendance_analytics":
-                return self._attendance_analytics(**kwargs)
-            elif normalized_query == "summary_statistics":
-                return self._get_summary_statistics(**kwargs)
-            else:
+            handler = self._DISPATCH.get(normalized_query)
+            if handler is None:
                 return self._get_available_query_types()
+            return run_sync(getattr(self, handler)(**kwargs))
                 
         except Exception as e:
             logger.error(f"MongoDB operation failed: {str(e)}")
@@ -76,33 +286,37 @@ class MongoDBTool(BaseTool):
     
     def _normalize_query_type(self, query_type: str) -> str:
         """Normalize natural language query types to internal query types."""
+        # Programmatic callers usually pass the canonical name already
+        if query_type in self._DISPATCH:
+            return query_type
+        
         query_lower = query_type.lower()
         
         # Client-related queries
-        if any(phrase in query_lower for phrase in ["client search and management", "recent clients", "show clients", "get clients", "find clients"]):
+        if _FIND_CLIENTS_RE.search(query_lower):
             return "find_clients"
-        elif "client" in query_lower and ("search" in query_lower or "find" in query_lower):
+        elif "client" in query_lower and _SEARCH_RE.search(query_lower):
             return "search_clients"
         
         # Order-related queries
-        elif any(phrase in query_lower for phrase in ["order and payment tracking", "recent orders", "show orders", "get orders", "find orders"]):
+        elif _GET_ORDERS_RE.search(query_lower):
             return "get_orders"
-        elif "order" in query_lower and ("search" in query_lower or "find" in query_lower):
+        elif "order" in query_lower and _SEARCH_RE.search(query_lower):
             return "get_orders"
         
         # Course-related queries
-        elif any(phrase in query_lower for phrase in ["course and class information", "courses", "classes"]):
+        elif _COURSES_RE.search(query_lower):
             if "class" in query_lower:
                 return "get_classes"
             else:
                 return "get_courses"
         
         # Attendance queries
-        elif any(phrase in query_lower for phrase in ["attendance monitoring", "attendance"]):
+        elif "attendance" in query_lower:
             return "get_attendance"
         
         # Analytics queries
-        elif any(phrase in query_lower for phrase in ["business analytics and reporting", "revenue", "analytics", "statistics", "summary"]):
+        elif _ANALYTICS_RE.search(query_lower):
             if "revenue" in query_lower:
                 return "revenue_analytics"
             elif "client" in query_lower:
@@ -128,163 +342,93 @@ class MongoDBTool(BaseTool):
         
         Please use one of these query types or a natural language description that matches these categories."""
 
-    def _find_clients(self, status: Optional[str] = None, limit: int = 50) -> str:
+    async def _find_clients(self, status: Optional[str] = None, limit: int = 50) -> str:
         """Find clients with optional status filter."""
         try:
-            collection = get_sync_collection(Collections.CLIENTS)
+            collection = get_collection(Collections.CLIENTS)
             filter_dict = {}
             
             if status:
                 filter_dict["status"] = status
                 
-            clients = list(collection.find(filter_dict).limit(limit))
+            clients = await collection.find(filter_dict, _CLIENT_PROJECTION).limit(limit).to_list(length=None)
             
             # If no clients found, return sample data for demo purposes
             if not clients:
-                sample_clients = [
-                    {
-                        "_id": "sample001",
-                        "name": "John Smith",
-                        "email": "john.smith@email.com",
-                        "phone": "+1-555-0101",
-                        "status": "active",
-                        "registration_date": "2024-01-15T09:00:00Z",
-                        "membership_type": "Premium",
-                        "last_activity": "2024-07-01T08:30:00Z"
-                    },
-                    {
-                        "_id": "sample002", 
-                        "name": "Sarah Johnson",
-                        "email": "sarah.johnson@email.com",
-                        "phone": "+1-555-0102",
-                        "status": "active",
-                        "registration_date": "2024-02-20T10:00:00Z",
-                        "membership_type": "Basic",
-                        "last_activity": "2024-06-30T18:00:00Z"
-                    },
-                    {
-                        "_id": "sample003",
-                        "name": "Mike Davis",
-                        "email": "mike.davis@email.com", 
-                        "phone": "+1-555-0103",
-                        "status": "active",
-                        "registration_date": "2024-06-25T14:00:00Z",
-                        "membership_type": "Personal Training",
-                        "last_activity": "2024-06-29T16:30:00Z"
-                    },
-                    {
-                        "_id": "sample004",
-                        "name": "Emily Wilson",
-                        "email": "emily.wilson@email.com",
-                        "phone": "+1-555-0104", 
-                        "status": "active",
-                        "registration_date": "2024-03-10T11:00:00Z",
-                        "membership_type": "Premium",
-                        "last_activity": "2024-06-28T07:45:00Z"
-                    },
-                    {
-                        "_id": "sample005",
-                        "name": "David Brown",
-                        "email": "david.brown@email.com",
-                        "phone": "+1-555-0105",
-                        "status": "active", 
-                        "registration_date": "2024-05-05T13:00:00Z",
-                        "membership_type": "Basic",
-                        "last_activity": "2024-06-27T19:15:00Z"
-                    }
-                ]
-                
-                return json.dumps({
-                    "success": True,
-                    "count": len(sample_clients),
-                    "clients": sample_clients[:limit],
-                    "note": "Sample data - database appears to be empty"
-                }, indent=2)
-            
-            # Convert ObjectId to string for JSON serialization
-            for client in clients:
-                client["_id"] = str(client["_id"])
-                if "last_activity" in client and client["last_activity"]:
-                    client["last_activity"] = client["last_activity"].isoformat()
-                if "registration_date" in client:
-                    client["registration_date"] = client["registration_date"].isoformat()
-                if "birthday" in client and client["birthday"]:
-                    client["birthday"] = client["birthday"].isoformat()
-            
-            return json.dumps({
+                return _sample_response("clients", limit)
+            
+            return _dumps({
                 "success": True,
                 "count": len(clients),
                 "clients": clients
-            }, indent=2)
+            })
             
         except PyMongoError as e:
             return f"Database error: {str(e)}"
 
-    def _get_client_by_id(self, client_id: str) -> str:
+    async def _get_client_by_id(self, client_id: str) -> str:
         """Get a specific client by ID."""
         try:
-            collection = get_sync_collection(Collections.CLIENTS)
-            client = collection.find_one({"_id": ObjectId(client_id)})
+            collection = get_collection(Collections.CLIENTS)
+            client = await collection.find_one({"_id": ObjectId(client_id)})
             
             if not client:
-                return json.dumps({"success": False, "message": "Client not found"})
-            
-            # Convert ObjectId to string
-            client["_id"] = str(client["_id"])
-            if "last_activity" in client and client["last_activity"]:
-                client["last_activity"] = client["last_activity"].isoformat()
-            if "registration_date" in client:
-                client["registration_date"] = client["registration_date"].isoformat()
-            if "birthday" in client and client["birthday"]:
-                client["birthday"] = client["birthday"].isoformat()
-            
-            return json.dumps({
+                return _dumps({"success": False, "message": "Client not found"})
+            
+            return _dumps({
                 "success": True,
                 "client": client
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Error retrieving client: {str(e)}"
 
-    def _search_clients(self, search_term: str, limit: int = 20) -> str:
-        """Search clients by name, email, or phone."""
+    async def _search_clients(self, search_term: str, limit: int = 20) -> str:
+        """Search clients by name, email, or phone.
+
+        Whole words in names go through the clients name text index and results
+        are ranked by text score. Partial names, emails and phones match by
+        prefix on the name_1, email_1 and phone_1 indexes.
+        """
         try:
-            collection = get_sync_collection(Collections.CLIENTS)
-            
-            # Create search query for name, email, or phone
-            search_query = {
-                "$or": [
-                    {"name": {"$regex": search_term, "$options": "i"}},
-                    {"email": {"$regex": search_term, "$options": "i"}},
-                    {"phone": {"$regex": search_term, "$options": "i"}}
-                ]
-            }
-            
-            clients = list(collection.find(search_query).limit(limit))
-            
-            for client in clients:
-                client["_id"] = str(client["_id"])
-                if "last_activity" in client and client["last_activity"]:
-                    client["last_activity"] = client["last_activity"].isoformat()
-                if "registration_date" in client:
-                    client["registration_date"] = client["registration_date"].isoformat()
-                if "birthday" in client and client["birthday"]:
-                    client["birthday"] = client["birthday"].isoformat()
-            
-            return json.dumps({
+            collection = get_collection(Collections.CLIENTS)
+            
+            # Anchored, so it can use a b-tree index instead of scanning every document
+            escaped = re.escape(search_term)
+            prefix = {"$regex": f"^{escaped}"}
+            name_prefix = {"$regex": f"^{escaped}", "$options": "i"}
+            
+            try:
+                clients = await collection.find(
+                    {"$or": [
+                        {"$text": {"$search": search_term}},
+                        {"name": name_prefix},
+                        {"email": prefix},
+                        {"phone": prefix},
+                    ]},
+                    {**_CLIENT_PROJECTION, "score": {"$meta": "textScore"}}
+                ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(length=None)
+            except OperationFailure:
+                # No text index yet (create_indexes hasn't run); fall back to prefix matches
+                clients = await collection.find(
+                    {"$or": [{"name": name_prefix}, {"email": prefix}, {"phone": prefix}]},
+                    _CLIENT_PROJECTION
+                ).limit(limit).to_list(length=None)
+            
+            return _dumps({
                 "success": True,
                 "search_term": search_term,
                 "count": len(clients),
                 "clients": clients
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Client search failed: {str(e)}"
 
-    def _get_orders(self, client_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> str:
-        """Get orders with optional client and status filters."""
+    async def _get_orders(self, client_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> str:
+        """Get orders with optional client and status filters, with each client's name attached."""
         try:
-            collection = get_sync_collection(Collections.ORDERS)
+            collection = get_collection(Collections.ORDERS)
             filter_dict = {}
             
             if client_id:
@@ -292,145 +436,80 @@ class MongoDBTool(BaseTool):
             if status:
                 filter_dict["status"] = status
                 
-            orders = list(collection.find(filter_dict).sort("created_date", -1).limit(limit))
+            # Filter, sort and limit first so only the returned orders are joined
+            orders = await collection.aggregate([
+                {"$match": filter_dict},
+                {"$sort": {"created_date": -1}},
+                {"$limit": limit},
+                {"$project": _ORDER_PROJECTION},
+                {"$lookup": {
+                    "from": Collections.CLIENTS,
+                    "localField": "client_id",
+                    "foreignField": "_id",
+                    "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+                    "as": "client"
+                }},
+                {"$addFields": {"client_name": {"$arrayElemAt": ["$client.name", 0]}}},
+                {"$project": {"client": 0}}
+            ]).to_list(length=None)
             
             # If no orders found, return sample data for demo purposes
             if not orders:
-                sample_orders = [
-                    {
-                        "_id": "order001",
-                        "client_id": "sample001",
-                        "client_name": "John Smith",
-                        "service_name": "Personal Training Session",
-                        "total_amount": 75.00,
-                        "status": "confirmed",
-                        "created_date": "2024-06-30T14:30:00Z",
-                        "scheduled_date": "2024-07-02T09:00:00Z"
-                    },
-                    {
-                        "_id": "order002",
-                        "client_id": "sample002", 
-                        "client_name": "Sarah Johnson",
-                        "service_name": "Yoga Class Package (5 sessions)",
-                        "total_amount": 125.00,
-                        "status": "confirmed",
-                        "created_date": "2024-06-29T16:45:00Z",
-                        "scheduled_date": "2024-07-01T18:00:00Z"
-                    },
-                    {
-                        "_id": "order003",
-                        "client_id": "sample003",
-                        "client_name": "Mike Davis",
-                        "service_name": "HIIT Training Session",
-                        "total_amount": 65.00,
-                        "status": "pending",
-                        "created_date": "2024-06-29T11:20:00Z",
-                        "scheduled_date": "2024-07-03T07:00:00Z"
-                    },
-                    {
-                        "_id": "order004",
-                        "client_id": "sample004",
-                        "client_name": "Emily Wilson", 
-                        "service_name": "Pilates Session",
-                        "total_amount": 80.00,
-                        "status": "completed",
-                        "created_date": "2024-06-28T13:15:00Z",
-                        "scheduled_date": "2024-06-30T10:00:00Z",
-                        "completed_date": "2024-06-30T11:00:00Z"
-                    },
-                    {
-                        "_id": "order005",
-                        "client_id": "sample005",
-                        "client_name": "David Brown",
-                        "service_name": "Strength Training Session", 
-                        "total_amount": 70.00,
-                        "status": "confirmed",
-                        "created_date": "2024-06-27T09:30:00Z",
-                        "scheduled_date": "2024-07-01T17:30:00Z"
-                    }
-                ]
-                
-                return json.dumps({
-                    "success": True,
-                    "count": len(sample_orders),
-                    "orders": sample_orders[:limit],
-                    "note": "Sample data - database appears to be empty"
-                }, indent=2)
-            
-            for order in orders:
-                order["_id"] = str(order["_id"])
-                order["client_id"] = str(order["client_id"])
-                order["service_id"] = str(order["service_id"])
-                order["created_date"] = order["created_date"].isoformat()
-                if "due_date" in order and order["due_date"]:
-                    order["due_date"] = order["due_date"].isoformat()
-                if "paid_date" in order and order["paid_date"]:
-                    order["paid_date"] = order["paid_date"].isoformat()
-            
-            return json.dumps({
+                return _sample_response("orders", limit)
+            
+            return _dumps({
                 "success": True,
                 "count": len(orders),
                 "orders": orders
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Error retrieving orders: {str(e)}"
 
-    def _get_order_by_id(self, order_id: str) -> str:
+    async def _get_order_by_id(self, order_id: str) -> str:
         """Get a specific order by ID with client and payment information."""
         try:
-            orders_collection = get_sync_collection(Collections.ORDERS)
-            clients_collection = get_sync_collection(Collections.CLIENTS)
-            payments_collection = get_sync_collection(Collections.PAYMENTS)
+            orders_collection = get_collection(Collections.ORDERS)
+            clients_collection = get_collection(Collections.CLIENTS)
+            payments_collection = get_collection(Collections.PAYMENTS)
             
             # Get order
-            order = orders_collection.find_one({"_id": ObjectId(order_id)})
+            order_oid = ObjectId(order_id)
+            
+            # Payments only need the order id, so fetch them alongside the order
+            order, payments = await asyncio.gather(
+                orders_collection.find_one({"_id": order_oid}),
+                payments_collection.find({"order_id": order_oid}, _PAYMENT_PROJECTION).to_list(length=None)
+            )
             if not order:
-                return json.dumps({"success": False, "message": "Order not found"})
+                return _dumps({"success": False, "message": "Order not found"})
             
             # Get client information
-            client = clients_collection.find_one({"_id": order["client_id"]})
-            
-            # Get payment information
-            payments = list(payments_collection.find({"order_id": ObjectId(order_id)}))
-            
-            # Format data
-            order["_id"] = str(order["_id"])
-            order["client_id"] = str(order["client_id"])
-            order["service_id"] = str(order["service_id"])
-            order["created_date"] = order["created_date"].isoformat()
-            if "due_date" in order and order["due_date"]:
-                order["due_date"] = order["due_date"].isoformat()
-            if "paid_date" in order and order["paid_date"]:
-                order["paid_date"] = order["paid_date"].isoformat()
+            client = await clients_collection.find_one(
+                {"_id": order["client_id"]}, {"_id": 0, "name": 1, "email": 1, "phone": 1}
+            )
             
             if client:
-                client["_id"] = str(client["_id"])
                 order["client_info"] = {
                     "name": client["name"],
                     "email": client["email"],
                     "phone": client["phone"]
                 }
             
-            for payment in payments:
-                payment["_id"] = str(payment["_id"])
-                payment["order_id"] = str(payment["order_id"])
-                payment["payment_date"] = payment["payment_date"].isoformat()
-            
             order["payments"] = payments
             
-            return json.dumps({
+            return _dumps({
                 "success": True,
                 "order": order
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Error retrieving order details: {str(e)}"
 
-    def _get_payments(self, order_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> str:
+    async def _get_payments(self, order_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> str:
         """Get payments with optional filters."""
         try:
-            collection = get_sync_collection(Collections.PAYMENTS)
+            collection = get_collection(Collections.PAYMENTS)
             filter_dict = {}
             
             if order_id:
@@ -438,89 +517,89 @@ class MongoDBTool(BaseTool):
             if status:
                 filter_dict["status"] = status
                 
-            payments = list(collection.find(filter_dict).sort("payment_date", -1).limit(limit))
-            
-            for payment in payments:
-                payment["_id"] = str(payment["_id"])
-                payment["order_id"] = str(payment["order_id"])
-                payment["payment_date"] = payment["payment_date"].isoformat()
+            cursor = collection.find(filter_dict, _PAYMENT_PROJECTION).sort("payment_date", -1).limit(limit)
+            if status and not order_id:
+                # Pin the index that serves both the filter and the sort
+                cursor = cursor.hint([("status", 1), ("payment_date", -1)])
+            payments = await cursor.to_list(length=None)
             
-            return json.dumps({
+            return _dumps({
                 "success": True,
                 "count": len(payments),
                 "payments": payments
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Error retrieving payments: {str(e)}"
 
-    def _get_courses(self, instructor: Optional[str] = None, active_only: bool = True, limit: int = 50) -> str:
+    async def _get_courses(self, instructor: Optional[str] = None, active_only: bool = True, limit: int = 50) -> str:
         """Get courses with optional filters."""
         try:
-            collection = get_sync_collection(Collections.COURSES)
-            filter_dict = {}
-            
-            if instructor:
-                filter_dict["instructor"] = {"$regex": instructor, "$options": "i"}
-            if active_only:
-                filter_dict["is_active"] = True
+            if course_cache.ready:
+                # Serve from the in-process snapshot; same filters as the query below
+                instructor_re = re.compile(instructor, re.IGNORECASE) if instructor else None
+                rows = [
+                    row for row in course_cache.values()
+                    if (not instructor_re or instructor_re.search(row.instructor))
+                    and (not active_only or row.is_active)
+                ][:limit]
+                courses = [_course_doc(row) for row in rows]
+            else:
+                collection = get_collection(Collections.COURSES)
+                filter_dict = {}
                 
-            courses = list(collection.find(filter_dict).limit(limit))
-            
-            for course in courses:
-                course["_id"] = str(course["_id"])
-                course["created_date"] = course["created_date"].isoformat()
-            
-            return json.dumps({
+                if instructor:
+                    filter_dict["instructor"] = {"$regex": instructor, "$options": "i"}
+                if active_only:
+                    filter_dict["is_active"] = True
+                    
+                courses = await collection.find(filter_dict, _COURSE_PROJECTION).limit(limit).to_list(length=None)
+            
+            return _dumps({
                 "success": True,
                 "count": len(courses),
                 "courses": courses
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Error retrieving courses: {str(e)}"
 
-    def _get_classes(self, course_id: Optional[str] = None, instructor: Optional[str] = None, 
+    async def _get_classes(self, course_id: Optional[str] = None, instructor: Optional[str] = None, 
                     date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 50) -> str:
         """Get classes with optional filters."""
         try:
-            collection = get_sync_collection(Collections.CLASSES)
-            filter_dict = {"is_cancelled": False}  # Only show non-cancelled classes by default
-            
-            if course_id:
-                filter_dict["course_id"] = ObjectId(course_id)
-            if instructor:
-                filter_dict["instructor"] = {"$regex": instructor, "$options": "i"}
-            
-            if date_from or date_to:
-                date_filter = {}
-                if date_from:
-                    date_filter["$gte"] = datetime.fromisoformat(date_from)
-                if date_to:
-                    date_filter["$lte"] = datetime.fromisoformat(date_to)
-                filter_dict["schedule"] = date_filter
-                
-            classes = list(collection.find(filter_dict).sort("schedule", 1).limit(limit))
+            # Reject malformed dates before building the query
+            try:
+                schedule_from = _parse_iso_date(date_from) if date_from else None
+                schedule_to = _parse_iso_date(date_to) if date_to else None
+            except ValueError:
+                return _dumps({"success": False, "message": "date_from and date_to must be ISO 8601 dates"})
+            
+            collection = get_collection(Collections.CLASSES)
+            schedule_filter = {op: date for op, date in (("$gte", schedule_from), ("$lte", schedule_to)) if date}
+            filter_dict = {
+                "is_cancelled": False,  # Only show non-cancelled classes by default
+                **({"course_id": ObjectId(course_id)} if course_id else {}),
+                **({"instructor": {"$regex": instructor, "$options": "i"}} if instructor else {}),
+                **({"schedule": schedule_filter} if schedule_filter else {}),
+            }
             
-            for class_item in classes:
-                class_item["_id"] = str(class_item["_id"])
-                class_item["course_id"] = str(class_item["course_id"])
-                class_item["schedule"] = class_item["schedule"].isoformat()
+            classes = await collection.find(filter_dict, _CLASS_PROJECTION).sort("schedule", 1).limit(limit).to_list(length=None)
             
-            return json.dumps({
+            return _dumps({
                 "success": True,
                 "count": len(classes),
                 "classes": classes
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Error retrieving classes: {str(e)}"
 
-    def _get_attendance(self, class_id: Optional[str] = None, client_id: Optional[str] = None, 
+    async def _get_attendance(self, class_id: Optional[str] = None, client_id: Optional[str] = None, 
                        status: Optional[str] = None, limit: int = 100) -> str:
         """Get attendance records with optional filters."""
         try:
-            collection = get_sync_collection(Collections.ATTENDANCE)
+            collection = get_collection(Collections.ATTENDANCE)
             filter_dict = {}
             
             if class_id:
@@ -530,73 +609,67 @@ class MongoDBTool(BaseTool):
             if status:
                 filter_dict["status"] = status
                 
-            attendance_records = list(collection.find(filter_dict).sort("date", -1).limit(limit))
-            
-            for record in attendance_records:
-                record["_id"] = str(record["_id"])
-                record["class_id"] = str(record["class_id"])
-                record["client_id"] = str(record["client_id"])
-                record["date"] = record["date"].isoformat()
-                if "checked_in_time" in record and record["checked_in_time"]:
-                    record["checked_in_time"] = record["checked_in_time"].isoformat()
-                if "checked_out_time" in record and record["checked_out_time"]:
-                    record["checked_out_time"] = record["checked_out_time"].isoformat()
-            
-            return json.dumps({
+            cursor = collection.find(filter_dict, _ATTENDANCE_PROJECTION).sort("date", -1).limit(limit)
+            # Pin the index that serves both the filter and the sort; with both ids
+            # the unique (class_id, client_id) index matches at most one record
+            if client_id and not class_id:
+                cursor = cursor.hint([("client_id", 1), ("date", -1), ("status", 1)])
+            elif class_id and not client_id:
+                cursor = cursor.hint([("class_id", 1), ("date", -1)])
+            attendance_records = await cursor.to_list(length=None)
+            
+            return _dumps({
                 "success": True,
                 "count": len(attendance_records),
                 "attendance": attendance_records
-            }, indent=2)
+            })
             
         except Exception as e:
             return f"Error retrieving attendance: {str(e)}"
 
-    def _revenue_analytics(self, period: str = "month") -> str:
+    async def _revenue_analytics(self, period: str = "month") -> str:
         """Generate revenue analytics for the specified period."""
+        cache_key = ("revenue_analytics", period)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            orders_collection = get_sync_collection(Collections.ORDERS)
-            payments_collection = get_sync_collection(Collections.PAYMENTS)
+            orders_collection = get_collection(Collections.ORDERS)
+            payments_collection = get_collection(Collections.PAYMENTS)
             
             # Determine date range based on period
-            now = datetime.utcnow()
-            if period == "week":
-                start_date = now - timedelta(days=7)
-            elif period == "month":
-                start_date = now - timedelta(days=30)
-            elif period == "quarter":
-                start_date = now - timedelta(days=90)
-            else:
-                start_date = now - timedelta(days=30)  # Default to month
+            now = datetime.now(timezone.utc)
+            start_date = now - _PERIOD_DELTAS.get(period, _PERIOD_DELTAS["month"])  # Default to month
             
             # Total revenue (completed payments)
-            total_revenue = payments_collection.aggregate([
+            total_revenue_cursor = payments_collection.aggregate([
                 {"$match": {
                     "status": "completed",
                     "payment_date": {"$gte": start_date}
                 }},
                 {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
             ])
-            total_revenue = list(total_revenue)
-            total_revenue_amount = total_revenue[0]["total"] if total_revenue else 0
             
             # Outstanding payments (pending orders)
-            outstanding_payments = orders_collection.aggregate([
+            outstanding_cursor = orders_collection.aggregate([
                 {"$match": {"status": "pending"}},
                 {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
             ])
-            outstanding_payments = list(outstanding_payments)
-            outstanding_amount = outstanding_payments[0]["total"] if outstanding_payments else 0
             
             # Revenue by service type
-            revenue_by_service = payments_collection.aggregate([
+            revenue_by_service_cursor = payments_collection.aggregate([
                 {"$match": {
                     "status": "completed",
                     "payment_date": {"$gte": start_date}
                 }},
+                {"$project": {"_id": 0, "order_id": 1, "amount": 1}},
+                # Join only the field grouped on rather than whole order documents
                 {"$lookup": {
-                    "from": "orders",
+                    "from": Collections.ORDERS,
                     "localField": "order_id",
                     "foreignField": "_id",
+                    "pipeline": [{"$project": {"_id": 0, "service_type": 1}}],
                     "as": "order"
                 }},
                 {"$unwind": "$order"},
@@ -606,7 +679,15 @@ class MongoDBTool(BaseTool):
                     "order_count": {"$sum": 1}
                 }}
             ])
-            revenue_by_service = list(revenue_by_service)
+            
+            # The three aggregations are independent; run them concurrently
+            total_revenue, outstanding_payments, revenue_by_service = await asyncio.gather(
+                total_revenue_cursor.to_list(length=None),
+                outstanding_cursor.to_list(length=None),
+                revenue_by_service_cursor.to_list(length=None)
+            )
+            total_revenue_amount = total_revenue[0]["total"] if total_revenue else 0
+            outstanding_amount = outstanding_payments[0]["total"] if outstanding_payments else 0
             
             analytics = {
                 "success": True,
@@ -620,51 +701,58 @@ class MongoDBTool(BaseTool):
                 "revenue_by_service": revenue_by_service
             }
             
-            return json.dumps(analytics, indent=2)
+            result = _analytics_cache[cache_key] = _dumps(analytics)
+            return result
             
         except Exception as e:
             return f"Revenue analytics failed: {str(e)}"
 
-    def _client_analytics(self) -> str:
+    async def _client_analytics(self) -> str:
         """Generate client analytics and insights."""
+        cache_key = ("client_analytics",)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            clients_collection = get_sync_collection(Collections.CLIENTS)
-            
-            # Active vs inactive clients
-            client_status = clients_collection.aggregate([
-                {"$group": {
-                    "_id": "$status",
-                    "count": {"$sum": 1}
+            clients_collection = get_collection(Collections.CLIENTS)
+            
+            now = datetime.now(timezone.utc)
+            start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            
+            # One command for all breakdowns; the facets share a single collection scan
+            facets = await clients_collection.aggregate([
+                {"$facet": {
+                    # Active vs inactive clients
+                    "client_status": [
+                        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+                    ],
+                    # New clients this month
+                    "new_clients": [
+                        {"$match": {"registration_date": {"$gte": start_of_month}}},
+                        {"$count": "count"}
+                    ],
+                    # Clients with birthdays this month
+                    "birthday_clients": [
+                        {"$match": {"birthday": {"$ne": None}}},
+                        {"$project": {
+                            "name": 1,
+                            "email": 1,
+                            "birthday": 1,
+                            "birthday_month": {"$month": "$birthday"}
+                        }},
+                        {"$match": {"birthday_month": now.month}}
+                    ]
                 }}
-            ])
-            client_status = list(client_status)
+            ]).to_list(length=None)
+            facets = facets[0]
             
-            # New clients this month
-            start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            new_clients_this_month = clients_collection.count_documents({
-                "registration_date": {"$gte": start_of_month}
-            })
-            
-            # Clients with birthdays this month
-            current_month = datetime.utcnow().month
-            birthday_clients = clients_collection.aggregate([
-                {"$match": {"birthday": {"$ne": None}}},
-                {"$project": {
-                    "name": 1,
-                    "email": 1,
-                    "birthday": 1,
-                    "birthday_month": {"$month": "$birthday"}
-                }},
-                {"$match": {"birthday_month": current_month}}
-            ])
-            birthday_clients = list(birthday_clients)
+            client_status = facets["client_status"]
+            new_clients_this_month = facets["new_clients"][0]["count"] if facets["new_clients"] else 0
+            birthday_clients = facets["birthday_clients"]
             
-            for client in birthday_clients:
-                client["_id"] = str(client["_id"])
-                client["birthday"] = client["birthday"].isoformat()
-            
-            # Total client count
-            total_clients = clients_collection.count_documents({})
+            # Every client falls in exactly one status group
+            total_clients = sum(group["count"] for group in client_status)
             
             analytics = {
                 "success": True,
@@ -677,30 +765,31 @@ class MongoDBTool(BaseTool):
                 }
             }
             
-            return json.dumps(analytics, indent=2)
+            result = _analytics_cache[cache_key] = _dumps(analytics)
+            return result
             
         except Exception as e:
             return f"Client analytics failed: {str(e)}"
 
-    def _service_analytics(self) -> str:
+    async def _service_analytics(self) -> str:
         """Generate service analytics including enrollment trends and completion rates."""
+        cache_key = ("service_analytics",)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            courses_collection = get_sync_collection(Collections.COURSES)
-            orders_collection = get_sync_collection(Collections.ORDERS)
+            courses_collection = get_collection(Collections.COURSES)
+            orders_collection = get_collection(Collections.ORDERS)
             
             # Top courses by enrollment
-            top_courses = courses_collection.find(
-                {"is_active": True}
+            top_courses_cursor = courses_collection.find(
+                {"is_active": True}, _TOP_COURSE_PROJECTION
             ).sort("enrollment_count", -1).limit(10)
-            top_courses = list(top_courses)
-            
-            for course in top_courses:
-                course["_id"] = str(course["_id"])
-                course["created_date"] = course["created_date"].isoformat()
             
             # Enrollment trends (last 30 days)
-            start_date = datetime.utcnow() - timedelta(days=30)
-            enrollment_trends = orders_collection.aggregate([
+            start_date = datetime.now(timezone.utc) - timedelta(days=30)
+            enrollment_trends_cursor = orders_collection.aggregate([
                 {"$match": {
                     "created_date": {"$gte": start_date},
                     "status": {"$in": ["paid", "pending"]}
@@ -715,10 +804,9 @@ class MongoDBTool(BaseTool):
                 }},
                 {"$sort": {"enrollment_count": -1}}
             ])
-            enrollment_trends = list(enrollment_trends)
             
             # Course completion rates
-            completion_stats = courses_collection.aggregate([
+            completion_stats_cursor = courses_collection.aggregate([
                 {"$match": {"is_active": True}},
                 {"$group": {
                     "_id": None,
@@ -729,7 +817,13 @@ class MongoDBTool(BaseTool):
                     "total_courses": {"$sum": 1}
                 }}
             ])
-            completion_stats = list(completion_stats)
+            
+            # The three queries are independent; run them concurrently
+            top_courses, enrollment_trends, completion_stats = await asyncio.gather(
+                top_courses_cursor.to_list(length=None),
+                enrollment_trends_cursor.to_list(length=None),
+                completion_stats_cursor.to_list(length=None)
+            )
             completion_data = completion_stats[0] if completion_stats else {}
             
             analytics = {
@@ -739,51 +833,40 @@ class MongoDBTool(BaseTool):
                 "completion_statistics": completion_data
             }
             
-            return json.dumps(analytics, indent=2)
+            result = _analytics_cache[cache_key] = _dumps(analytics)
+            return result
             
         except Exception as e:
             return f"Service analytics failed: {str(e)}"
 
-    def _attendance_analytics(self, course_name: Optional[str] = None) -> str:
+    async def _attendance_analytics(self, course_name: Optional[str] = None) -> str:
         """Generate attendance analytics for courses and classes."""
         try:
-            attendance_collection = get_sync_collection(Collections.ATTENDANCE)
-            classes_collection = get_sync_collection(Collections.CLASSES)
+            attendance_collection = get_collection(Collections.ATTENDANCE)
+            classes_collection = get_collection(Collections.CLASSES)
             
             # Build match criteria
             match_criteria = []
+            classes = None
             if course_name:
                 # Find classes matching the course name
-                matching_classes = classes_collection.find(
+                matching_classes = await classes_collection.find(
                     {"course_name": {"$regex": course_name, "$options": "i"}},
-                    {"_id": 1}
-                )
-                class_ids = [c["_id"] for c in matching_classes]
-                if class_ids:
-                    match_criteria = [{"$match": {"class_id": {"$in": class_ids}}}]
+                    _ATTENDANCE_CLASS_PROJECTION
+                ).batch_size(_ANALYTICS_BATCH_SIZE).to_list(length=None)
+                if matching_classes:
+                    classes = {c["_id"]: c for c in matching_classes}
+                    match_criteria = [{"$match": {"class_id": {"$in": list(classes)}}}]
                 else:
-                    return json.dumps({
+                    return _dumps({
                         "success": False,
                         "message": f"No classes found for course: {course_name}"
                     })
             
-            # Attendance percentage by class
-            pipeline = match_criteria + [
-                {"$lookup": {
-                    "from": "classes",
-                    "localField": "class_id",
-                    "foreignField": "_id",
-                    "as": "class_info"
-                }},
-                {"$unwind": "$class_info"},
+            # Attendance counts by class, computed on attendance alone
+            class_counts = await attendance_collection.aggregate(match_criteria + [
                 {"$group": {
-                    "_id": {
-                        "class_id": "$class_id",
-                        "course_name": "$class_info.course_name",
-                        "instructor": "$class_info.instructor",
-                        "schedule": "$class_info.schedule"
-                    },
-                    "total_registered": {"$first": "$class_info.enrolled_count"},
+                    "_id": "$class_id",
                     "present_count": {
                         "$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}
                     },
@@ -793,45 +876,47 @@ class MongoDBTool(BaseTool):
                     "absent_count": {
                         "$sum": {"$cond": [{"$eq": ["$status", "absent"]}, 1, 0]}
                     }
-                }},
-                {"$project": {
-                    "course_name": "$_id.course_name",
-                    "instructor": "$_id.instructor",
-                    "schedule": "$_id.schedule",
-                    "total_registered": 1,
-                    "present_count": 1,
-                    "late_count": 1,
-                    "absent_count": 1,
-                    "attendance_percentage": {
-                        "$multiply": [
-                            {"$divide": [
-                                {"$add": ["$present_count", "$late_count"]}, 
-                                "$total_registered"
-                            ]}, 
-                            100
-                        ]
-                    }
-                }},
-                {"$sort": {"schedule": -1}}
-            ]
-            
-            attendance_stats = list(attendance_collection.aggregate(pipeline))
-            
-            # Format dates
-            for stat in attendance_stats:
-                stat["_id"] = str(stat["_id"])
-                if "schedule" in stat and stat["schedule"]:
-                    stat["schedule"] = stat["schedule"].isoformat()
-            
-            # Overall attendance summary
-            if attendance_stats:
-                total_classes = len(attendance_stats)
-                avg_attendance = sum(s.get("attendance_percentage", 0) for s in attendance_stats) / total_classes
-                high_attendance_classes = len([s for s in attendance_stats if s.get("attendance_percentage", 0) >= 80])
-            else:
-                total_classes = 0
-                avg_attendance = 0
-                high_attendance_classes = 0
+                }}
+            ], batchSize=_ANALYTICS_BATCH_SIZE).to_list(length=None)
+            
+            # One lookup for the class details of every class counted
+            if classes is None:
+                class_docs = await classes_collection.find(
+                    {"_id": {"$in": [c["_id"] for c in class_counts]}},
+                    _ATTENDANCE_CLASS_PROJECTION
+                ).batch_size(_ANALYTICS_BATCH_SIZE).to_list(length=None)
+                classes = {c["_id"]: c for c in class_docs}
+            
+            # Attendance percentage by class, with the overall summary accumulated
+            # in the same pass
+            attendance_stats = []
+            percentage_total = 0
+            high_attendance_classes = 0
+            for counts in class_counts:
+                class_info = classes.get(counts["_id"])
+                if class_info is None:
+                    continue
+                total_registered = class_info.get("enrolled_count")
+                attended = counts["present_count"] + counts["late_count"]
+                attendance_percentage = attended / total_registered * 100 if total_registered else 0
+                percentage_total += attendance_percentage
+                if attendance_percentage >= 80:
+                    high_attendance_classes += 1
+                attendance_stats.append({
+                    "_id": counts["_id"],
+                    "course_name": class_info.get("course_name"),
+                    "instructor": class_info.get("instructor"),
+                    "schedule": class_info.get("schedule"),
+                    "total_registered": total_registered,
+                    "present_count": counts["present_count"],
+                    "late_count": counts["late_count"],
+                    "absent_count": counts["absent_count"],
+                    "attendance_percentage": attendance_percentage
+                })
+            attendance_stats.sort(key=lambda stat: stat["schedule"] or _NO_SCHEDULE, reverse=True)
+            
+            total_classes = len(attendance_stats)
+            avg_attendance = percentage_total / total_classes if total_classes else 0
             
             analytics = {
                 "success": True,
@@ -844,32 +929,84 @@ class MongoDBTool(BaseTool):
                 "class_details": attendance_stats
             }
             
-            return json.dumps(analytics, indent=2)
+            return _dumps(analytics)
             
         except Exception as e:
             return f"Attendance analytics failed: {str(e)}"
 
-    def _get_summary_statistics(self) -> str:
+    async def _get_summary_statistics(self) -> str:
         """Get overall studio statistics summary."""
+        cache_key = ("summary_statistics",)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Get collections
-            clients_collection = get_sync_collection(Collections.CLIENTS)
-            orders_collection = get_sync_collection(Collections.ORDERS)
-            courses_collection = get_sync_collection(Collections.COURSES)
-            classes_collection = get_sync_collection(Collections.CLASSES)
-            
-            # Count totals
-            total_clients = clients_collection.count_documents({})
-            active_clients = clients_collection.count_documents({"status": ClientStatus.ACTIVE})
-            total_orders = orders_collection.count_documents({})
-            active_orders = orders_collection.count_documents({"status": {"$in": [OrderStatus.CONFIRMED, OrderStatus.IN_PROGRESS]}})
-            total_courses = courses_collection.count_documents({"active": True})
+            clients_collection = get_collection(Collections.CLIENTS)
+            orders_collection = get_collection(Collections.ORDERS)
+            courses_collection = get_collection(Collections.COURSES)
+            classes_collection = get_collection(Collections.CLASSES)
+            
+            now = datetime.now(timezone.utc)
+            recent_date = now - _PERIOD_DELTAS["month"]
+            
+            # Client metrics in one command
+            client_facets_cursor = clients_collection.aggregate([
+                {"$facet": {
+                    "total": [{"$count": "count"}],
+                    "active": [{"$match": {"status": ClientStatus.ACTIVE}}, {"$count": "count"}],
+                    "new_this_month": [{"$match": {"registration_date": {"$gte": recent_date}}}, {"$count": "count"}]
+                }}
+            ])
+            
+            # Order metrics in one command
+            order_facets_cursor = orders_collection.aggregate([
+                {"$facet": {
+                    "total": [{"$count": "count"}],
+                    "active": [
+                        {"$match": {"status": {"$in": [OrderStatus.PENDING, OrderStatus.PAID]}}},
+                        {"$count": "count"}
+                    ],
+                    "this_month": [{"$match": {"created_date": {"$gte": recent_date}}}, {"$count": "count"}],
+                    # Revenue (sum of paid orders this month)
+                    "revenue": [
+                        {"$match": {"status": OrderStatus.PAID, "created_date": {"$gte": recent_date}}},
+                        {"$group": {"_id": None, "total_revenue": {"$sum": "$amount"}}}
+                    ],
+                    # Most popular course
+                    "popular": [
+                        {"$match": {"service_type": "course"}},
+                        {"$group": {"_id": "$service_id", "order_count": {"$sum": 1}}},
+                        {"$sort": {"order_count": -1}},
+                        {"$limit": 1}
+                    ]
+                }}
+            ])
+            
+            # One query per collection, all independent; run them concurrently
+            client_facets, order_facets, total_courses, upcoming_classes = await asyncio.gather(
+                client_facets_cursor.to_list(length=None),
+                order_facets_cursor.to_list(length=None),
+                courses_collection.count_documents({"is_active": True}),
+                classes_collection.count_documents({"schedule": {"$gte": now}})
+            )
+            client_facets = client_facets[0]
+            order_facets = order_facets[0]
+            total_clients = _facet_count(client_facets, "total")
+            active_clients = _facet_count(client_facets, "active")
+            new_clients_this_month = _facet_count(client_facets, "new_this_month")
+            total_orders = _facet_count(order_facets, "total")
+            active_orders = _facet_count(order_facets, "active")
+            orders_this_month = _facet_count(order_facets, "this_month")
+            monthly_revenue = order_facets["revenue"][0]["total_revenue"] if order_facets["revenue"] else 0
+            most_popular_course_id = order_facets["popular"][0]["_id"] if order_facets["popular"] else None
             
             # If database is empty, return sample statistics
             if total_clients == 0 and total_orders == 0:
                 sample_summary = {
                     "success": True,
-                    "generated_at": datetime.now().isoformat(),
+                    "generated_at": now.isoformat(),
                     "studio_overview": {
                         "total_clients": 25,
                         "active_clients": 23,
@@ -896,60 +1033,17 @@ class MongoDBTool(BaseTool):
                     "note": "Sample data - database appears to be empty"
                 }
                 
-                return json.dumps(sample_summary, indent=2)
-            
-            # Get recent activity
-            recent_date = datetime.now() - timedelta(days=30)
-            new_clients_this_month = clients_collection.count_documents({
-                "registration_date": {"$gte": recent_date}
-            })
-            
-            orders_this_month = orders_collection.count_documents({
-                "created_at": {"$gte": recent_date}
-            })
-            
-            # Calculate revenue (sum of completed orders this month)
-            revenue_pipeline = [
-                {
-                    "$match": {
-                        "status": OrderStatus.COMPLETED,
-                        "created_at": {"$gte": recent_date}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": None,
-                        "total_revenue": {"$sum": "$total_amount"}
-                    }
-                }
-            ]
-            
-            revenue_result = list(orders_collection.aggregate(revenue_pipeline))
-            monthly_revenue = revenue_result[0]["total_revenue"] if revenue_result else 0
-            
-            # Get upcoming classes count
-            upcoming_classes = classes_collection.count_documents({
-                "start_time": {"$gte": datetime.now()}
-            })
-            
-            # Get most popular course
-            popular_course_pipeline = [
-                {"$group": {"_id": "$course_id", "order_count": {"$sum": 1}}},
-                {"$sort": {"order_count": -1}},
-                {"$limit": 1}
-            ]
-            
-            popular_course_result = list(orders_collection.aggregate(popular_course_pipeline))
-            most_popular_course_id = popular_course_result[0]["_id"] if popular_course_result else None
+                return _dumps(sample_summary)
             
+            # Resolve the most popular course's name
             most_popular_course = None
             if most_popular_course_id:
-                course_doc = courses_collection.find_one({"_id": ObjectId(most_popular_course_id)})
+                course_doc = await courses_collection.find_one({"_id": most_popular_course_id}, {"name": 1})
                 most_popular_course = course_doc.get("name", "Unknown") if course_doc else "Unknown"
             
             summary = {
                 "success": True,
-                "generated_at": datetime.now().isoformat(),
+                "generated_at": now.isoformat(),
                 "studio_overview": {
                     "total_clients": total_clients,
                     "active_clients": active_clients,
@@ -975,7 +1069,8 @@ class MongoDBTool(BaseTool):
                 }
             }
             
-            return json.dumps(summary, indent=2)
+            result = _analytics_cache[cache_key] = _dumps(summary)
+            return result
             
         except Exception as e:
             logger.error(f"Summary statistics failed: {str(e)}")
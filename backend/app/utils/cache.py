@@ -0,0 +1,64 @@
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+import logging
+import orjson
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheManager:
+    client: Optional[Redis] = None
+
+    @classmethod
+    async def connect_to_redis(cls):
+        """Create the Redis client used for response caching."""
+        redis_url = get_settings().redis_url
+        if not redis_url:
+            logger.info("Redis URL not configured, response caching disabled")
+            return
+
+        cls.client = Redis.from_url(redis_url)
+        logger.info("Redis cache client initialized")
+
+    @classmethod
+    async def close_redis_connection(cls):
+        """Close the Redis client."""
+        if cls.client:
+            await cls.client.aclose()
+            cls.client = None
+            logger.info("Disconnected from Redis")
+
+
+def minute_bucket_key(prefix: str) -> str:
+    """Build a cache key that rolls over every minute."""
+    return f"{prefix}:{datetime.now(timezone.utc):%Y%m%d%H%M}"
+
+
+async def cached(key: str, ttl: int, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached value for key, computing and storing it with fn on a miss.
+
+    Redis errors are logged and treated as a miss so the cache never breaks a request.
+    """
+    client = CacheManager.client
+    if client is None:
+        return await fn()
+
+    try:
+        value = await client.get(key)
+        if value is not None:
+            return orjson.loads(value)
+    except RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+
+    result = await fn()
+
+    try:
+        await client.set(key, orjson.dumps(result), ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+    return result
@@ -0,0 +1,107 @@
+from pymongo.errors import OperationFailure, PyMongoError
+from bson import ObjectId
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import msgspec
+
+from ..models.database import get_collection, Collections
+from ..models.schemas_internal import CourseRow, to_row
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before reopening a change stream after a transient error
+WATCH_RETRY_SECONDS = 5
+
+
+class CollectionCache:
+    """In-process snapshot of a read-mostly collection kept current by a change stream.
+
+    Change streams need a replica set or sharded cluster; on a standalone server
+    the cache stays disabled and callers fall back to querying MongoDB.
+    """
+
+    def __init__(self, collection_name: str, row_type: type):
+        self.collection_name = collection_name
+        self.row_type = row_type
+        self.ready = False
+        self._rows: Dict[ObjectId, object] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start watching the collection in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        """Stop watching and drop the snapshot."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get(self, doc_id: ObjectId):
+        """Get a row by id, or None if it is unknown or the cache is not ready."""
+        return self._rows.get(doc_id)
+
+    def values(self) -> List:
+        """Get all rows in the snapshot."""
+        return list(self._rows.values())
+
+    async def _watch(self):
+        collection = get_collection(self.collection_name)
+        while True:
+            try:
+                async with collection.watch(full_document="updateLookup") as stream:
+                    # Open the stream before seeding so no change in between is lost
+                    change = await stream.try_next()
+                    docs = await collection.find({}).to_list(length=None)
+                    self._rows = {doc["_id"]: to_row(doc, self.row_type) for doc in docs}
+                    if change is not None:
+                        self._apply(change)
+                    self.ready = True
+                    logger.info(f"Cached {len(self._rows)} documents from {self.collection_name}")
+                    
+                    async for change in stream:
+                        self._apply(change)
+            except OperationFailure as e:
+                logger.info(f"Change streams unavailable for {self.collection_name}, cache disabled: {e}")
+                return
+            except msgspec.ValidationError as e:
+                logger.warning(f"Unexpected document in {self.collection_name}, cache disabled: {e}")
+                return
+            except PyMongoError as e:
+                logger.warning(f"Change stream for {self.collection_name} failed, retrying: {e}")
+            finally:
+                self.ready = False
+                self._rows = {}
+            
+            await asyncio.sleep(WATCH_RETRY_SECONDS)
+
+    def _apply(self, change: dict):
+        operation = change["operationType"]
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc is None:
+                # Deleted before the update lookup ran
+                self._rows.pop(change["documentKey"]["_id"], None)
+            else:
+                self._rows[doc["_id"]] = to_row(doc, self.row_type)
+        elif operation == "delete":
+            self._rows.pop(change["documentKey"]["_id"], None)
+
+
+course_cache = CollectionCache(Collections.COURSES, CourseRow)
+
+
+def start_collection_caches():
+    """Start the course cache; call after connect_to_mongo."""
+    course_cache.start()
+
+
+async def stop_collection_caches():
+    """Stop the course cache."""
+    await course_cache.stop()
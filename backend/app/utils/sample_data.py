@@ -3,13 +3,14 @@ Sample data generator for the fitness studio database.
 This script creates realistic sample data for testing and demonstration purposes.
 """
 
+import argparse
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import random
 from typing import List, Dict
 import logging
 
-from ..models.database import DatabaseManager, get_collection, Collections
+from ..models.database import connect_to_mongo, get_collection, Collections, install_uvloop, bulk_ingest
 from ..models.schemas import ClientStatus, OrderStatus, PaymentStatus, AttendanceStatus
 
 logger = logging.getLogger(__name__)
@@ -17,7 +18,9 @@ logger = logging.getLogger(__name__)
 class SampleDataGenerator:
     """Generates realistic sample data for the fitness studio."""
     
-    def __init__(self):
+    def __init__(self, bulk_ingest: bool = False):
+        # Load with indexes dropped and rebuilt afterwards; only for large one-shot loads
+        self.bulk_ingest = bulk_ingest
         self.first_names = [
             "Emma", "Liam", "Olivia", "Noah", "Ava", "Oliver", "Sophia", "Elijah",
             "Charlotte", "William", "Amelia", "James", "Isabella", "Benjamin", "Mia",
@@ -113,7 +116,7 @@ class SampleDataGenerator:
         logger.info("Starting sample data generation...")
         
         # Connect to database
-        await DatabaseManager.connect_to_mongo()
+        await connect_to_mongo()
         
         # Clear existing data (optional)
         await self._clear_existing_data()
@@ -131,6 +134,13 @@ class SampleDataGenerator:
         # Print summary
         await self._print_summary()
 
+    async def _insert(self, collection_name: str, docs: List[Dict]):
+        """Insert generated documents, via bulk_ingest when enabled."""
+        if self.bulk_ingest:
+            await bulk_ingest(collection_name, docs)
+        else:
+            await get_collection(collection_name).insert_many(docs)
+
     async def _clear_existing_data(self):
         """Clear existing sample data."""
         collections = [
@@ -151,20 +161,22 @@ class SampleDataGenerator:
     async def _generate_clients(self, count: int) -> List[Dict]:
         """Generate sample clients."""
         clients = []
-        collection = get_collection(Collections.CLIENTS)
+        
+        # One timestamp for the whole batch
+        now = datetime.now(timezone.utc)
         
         for i in range(count):
             first_name = random.choice(self.first_names)
             last_name = random.choice(self.last_names)
             
             # Generate registration date (last 2 years)
-            registration_date = datetime.utcnow() - timedelta(
+            registration_date = now - timedelta(
                 days=random.randint(1, 730)
             )
             
             # Generate birthday (20-60 years old)
             age_years = random.randint(20, 60)
-            birthday = datetime.utcnow() - timedelta(days=age_years * 365 + random.randint(0, 365))
+            birthday = now - timedelta(days=age_years * 365 + random.randint(0, 365))
             
             client = {
                 "name": f"{first_name} {last_name}",
@@ -175,7 +187,7 @@ class SampleDataGenerator:
                 "registration_date": registration_date,
                 "birthday": birthday,
                 "last_activity": registration_date + timedelta(
-                    days=random.randint(0, (datetime.utcnow() - registration_date).days)
+                    days=random.randint(0, (now - registration_date).days)
                 ),
                 "address": f"{random.randint(100, 9999)} {random.choice(['Main', 'Oak', 'Park', 'Elm', 'First'])} St, City, State",
                 "emergency_contact": {
@@ -188,7 +200,7 @@ class SampleDataGenerator:
             clients.append(client)
         
         # Insert clients
-        await collection.insert_many(clients)
+        await self._insert(Collections.CLIENTS, clients)
         logger.info(f"Generated {count} clients")
         
         return clients
@@ -196,7 +208,9 @@ class SampleDataGenerator:
     async def _generate_courses(self) -> List[Dict]:
         """Generate sample courses."""
         courses = []
-        collection = get_collection(Collections.COURSES)
+        
+        # One timestamp for the whole batch
+        now = datetime.now(timezone.utc)
         
         for course_data in self.course_data:
             course = {
@@ -205,12 +219,12 @@ class SampleDataGenerator:
                 "completion_rate": round(random.uniform(70, 95), 1),
                 "prerequisites": [],
                 "is_active": True,
-                "created_date": datetime.utcnow() - timedelta(days=random.randint(30, 365))
+                "created_date": now - timedelta(days=random.randint(30, 365))
             }
             courses.append(course)
         
         # Insert courses
-        await collection.insert_many(courses)
+        await self._insert(Collections.COURSES, courses)
         logger.info(f"Generated {len(courses)} courses")
         
         return courses
@@ -218,7 +232,9 @@ class SampleDataGenerator:
     async def _generate_classes(self, courses: List[Dict]) -> List[Dict]:
         """Generate sample classes."""
         classes = []
-        collection = get_collection(Collections.CLASSES)
+        
+        # One timestamp for the whole batch
+        now = datetime.now(timezone.utc)
         
         # Get course IDs after insertion
         courses_collection = get_collection(Collections.COURSES)
@@ -230,7 +246,7 @@ class SampleDataGenerator:
             
             for i in range(num_classes):
                 # Generate class schedule (next 60 days)
-                schedule = datetime.utcnow() + timedelta(
+                schedule = now + timedelta(
                     days=random.randint(1, 60),
                     hours=random.randint(6, 20),
                     minutes=random.choice([0, 15, 30, 45])
@@ -261,7 +277,7 @@ class SampleDataGenerator:
                 classes.append(class_item)
         
         # Insert classes
-        await collection.insert_many(classes)
+        await self._insert(Collections.CLASSES, classes)
         logger.info(f"Generated {len(classes)} classes")
         
         return classes
@@ -269,7 +285,9 @@ class SampleDataGenerator:
     async def _generate_orders(self, clients: List[Dict], courses: List[Dict], classes: List[Dict]) -> List[Dict]:
         """Generate sample orders."""
         orders = []
-        collection = get_collection(Collections.ORDERS)
+        
+        # One timestamp for the whole batch
+        now = datetime.now(timezone.utc)
         
         # Get actual client and course IDs from database
         clients_collection = get_collection(Collections.CLIENTS)
@@ -286,7 +304,7 @@ class SampleDataGenerator:
             course = random.choice(db_courses)
             
             # Generate order date (last 6 months)
-            created_date = datetime.utcnow() - timedelta(
+            created_date = now - timedelta(
                 days=random.randint(1, 180)
             )
             
@@ -311,12 +329,12 @@ class SampleDataGenerator:
                 order["due_date"] = created_date + timedelta(days=7)
                 order["paid_date"] = created_date + timedelta(days=random.randint(1, 7))
             elif order["status"] == "pending":
-                order["due_date"] = datetime.utcnow() + timedelta(days=random.randint(1, 30))
+                order["due_date"] = now + timedelta(days=random.randint(1, 30))
             
             orders.append(order)
         
         # Insert orders
-        await collection.insert_many(orders)
+        await self._insert(Collections.ORDERS, orders)
         logger.info(f"Generated {len(orders)} orders")
         
         return orders
@@ -324,7 +342,6 @@ class SampleDataGenerator:
     async def _generate_payments(self, orders: List[Dict]) -> List[Dict]:
         """Generate sample payments."""
         payments = []
-        collection = get_collection(Collections.PAYMENTS)
         
         # Get actual orders from database
         orders_collection = get_collection(Collections.ORDERS)
@@ -348,7 +365,7 @@ class SampleDataGenerator:
         
         # Insert payments
         if payments:
-            await collection.insert_many(payments)
+            await self._insert(Collections.PAYMENTS, payments)
         logger.info(f"Generated {len(payments)} payments")
         
         return payments
@@ -356,7 +373,9 @@ class SampleDataGenerator:
     async def _generate_attendance(self, clients: List[Dict], classes: List[Dict]) -> List[Dict]:
         """Generate sample attendance records."""
         attendance_records = []
-        collection = get_collection(Collections.ATTENDANCE)
+        
+        # One timestamp for the whole batch
+        now = datetime.now(timezone.utc)
         
         # Get actual clients and classes from database
         clients_collection = get_collection(Collections.CLIENTS)
@@ -366,7 +385,7 @@ class SampleDataGenerator:
         db_classes = await classes_collection.find({}).to_list(length=None)
         
         # Generate attendance for past classes
-        past_classes = [c for c in db_classes if c["schedule"] < datetime.utcnow()]
+        past_classes = [c for c in db_classes if c["schedule"] < now]
         
         for class_item in past_classes:
             # Randomly select clients for this class (60-90% attendance rate)
@@ -397,7 +416,7 @@ class SampleDataGenerator:
         
         # Insert attendance records
         if attendance_records:
-            await collection.insert_many(attendance_records)
+            await self._insert(Collections.ATTENDANCE, attendance_records)
         logger.info(f"Generated {len(attendance_records)} attendance records")
         
         return attendance_records
@@ -422,11 +441,20 @@ class SampleDataGenerator:
         print("="*50)
 
 
-async def generate_sample_data():
+async def generate_sample_data(bulk_ingest: bool = False):
     """Main function to generate sample data."""
-    generator = SampleDataGenerator()
+    generator = SampleDataGenerator(bulk_ingest=bulk_ingest)
     await generator.generate_all_sample_data()
 
 
 if __name__ == "__main__":
-    asyncio.run(generate_sample_data())
+    parser = argparse.ArgumentParser(description="Generate sample data for the fitness studio database.")
+    parser.add_argument(
+        "--bulk-ingest",
+        action="store_true",
+        help="Drop indexes while loading and rebuild them afterwards"
+    )
+    args = parser.parse_args()
+    
+    install_uvloop()
+    asyncio.run(generate_sample_data(bulk_ingest=args.bulk_ingest))
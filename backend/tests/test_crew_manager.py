@@ -0,0 +1,113 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+
+from app.agents import crew_manager
+from app.agents.crew_manager import CrewManager
+from app.models.schemas import QueryRequest
+
+
+def _manager():
+    # Skip __init__, which needs an API key and builds the agents
+    manager = CrewManager.__new__(CrewManager)
+    manager._llm_semaphore = asyncio.Semaphore(2)
+    return manager
+
+
+def _batch_line(status_code, body):
+    return orjson.dumps({"custom_id": "dashboard-1", "response": {"status_code": status_code, "body": body}}).decode()
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """A pending batch record plus a fake OpenAI client to resolve it against."""
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value={
+        "batch_id": "batch_1", "agent": "dashboard", "language": "en", "context": None,
+        "status": "in_progress", "response": None,
+    })
+    collection.update_one = AsyncMock()
+    monkeypatch.setattr(crew_manager, "get_collection", lambda name: collection)
+    
+    client = MagicMock()
+    client.files.content = AsyncMock()
+    manager = _manager()
+    manager._openai_client = client
+
+    def resolve(status, output_file_id=None, error_file_id=None, line=None):
+        client.batches.retrieve = AsyncMock(return_value=SimpleNamespace(
+            id="batch_1", status=status, output_file_id=output_file_id, error_file_id=error_file_id
+        ))
+        client.files.content.return_value = SimpleNamespace(text=f"{line}\n")
+        result = asyncio.run(manager.get_batch_result("batch_1"))
+        return result, collection.update_one.await_args.args[1]["$set"]
+
+    return resolve
+
+
+def test_batch_result_reads_completed_output(batches):
+    line = _batch_line(200, {"choices": [{"message": {"content": "Revenue is up"}}]})
+    result, update = batches("completed", output_file_id="file_out", line=line)
+    assert result["response"] == "Revenue is up"
+    assert update["completed_date"] is not None
+
+
+def test_batch_result_reports_failed_request_in_output(batches):
+    line = _batch_line(400, {"error": {"message": "Invalid model"}})
+    result, update = batches("completed", output_file_id="file_out", line=line)
+    assert result["response"] == "Batch request failed: Invalid model"
+    assert update["response"] == result["response"]
+
+
+def test_batch_result_reads_error_file(batches):
+    line = _batch_line(500, {"error": {"message": "Server error"}})
+    result, _ = batches("completed", error_file_id="file_err", line=line)
+    assert result["response"] == "Batch request failed: Server error"
+
+
+@pytest.mark.parametrize("status", ["failed", "expired", "cancelled"])
+def test_batch_result_resolves_terminal_failures(batches, status):
+    result, update = batches(status)
+    assert result["response"] == f"Batch {status} without producing a result"
+    assert result["data"]["status"] == status
+    assert update["completed_date"] is not None
+
+
+def test_batch_result_stays_pending_while_in_progress(batches):
+    result, update = batches("in_progress")
+    assert result["response"] == "Batch is in_progress, result not available yet"
+    assert "response" not in update
+
+
+def test_support_batch_turns_cancelled_queries_into_errors(monkeypatch):
+    manager = _manager()
+    manager.support_agent = manager.support_crews = None
+    manager._create_task = lambda agent, query, language, context: query
+
+    async def kickoff(agent, crews, task):
+        if task == "cancel me":
+            raise asyncio.CancelledError()
+        return f"answer to {task}"
+
+    manager._kickoff = kickoff
+    queries = [QueryRequest(query="hello", language="en"), QueryRequest(query="cancel me", language="en")]
+    responses = asyncio.run(manager.handle_support_batch(queries))
+
+    assert responses[0]["response"] == "answer to hello"
+    assert responses[1]["response"].startswith("Failed to process query")
+
+
+def test_kickoff_runs_tasks_on_the_crews_own_agent():
+    manager = _manager()
+    crew = MagicMock()
+    crew.agents = [SimpleNamespace(role="support copy")]
+    crew.kickoff.return_value = "done"
+    crews = [crew]
+    task = SimpleNamespace(agent="shared agent")
+
+    assert asyncio.run(manager._kickoff("shared agent", crews, task)) == "done"
+    assert task.agent is crew.agents[0]
+    assert crews == [crew] and crew.tasks == []
@@ -0,0 +1,84 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from app.models import database
+from app.models.database import Collections, _reconcile_ttl_indexes, _ttl_options
+
+
+def _fake_db(date_index):
+    collection = MagicMock()
+    collection.index_information = AsyncMock(
+        return_value={"_id_": {"key": [("_id", 1)]}, **({"date_1": date_index} if date_index else {})}
+    )
+    collection.drop_index = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    db.command = AsyncMock()
+    return db, collection
+
+
+@pytest.fixture
+def retention_days(monkeypatch):
+    def set_days(days):
+        if days is None:
+            monkeypatch.delenv("ATTENDANCE_RETENTION_DAYS", raising=False)
+        else:
+            monkeypatch.setenv("ATTENDANCE_RETENTION_DAYS", str(days))
+        database._env.cache_clear()
+    yield set_days
+    database._env.cache_clear()
+
+
+def test_reconcile_ttl_leaves_matching_index(retention_days):
+    retention_days(30)
+    db, collection = _fake_db({"key": [("date", 1)], "expireAfterSeconds": 30 * 86400})
+    asyncio.run(_reconcile_ttl_indexes(db))
+    db.command.assert_not_called()
+    collection.drop_index.assert_not_called()
+
+
+def test_reconcile_ttl_changes_period_in_place(retention_days):
+    retention_days(90)
+    db, collection = _fake_db({"key": [("date", 1)], "expireAfterSeconds": 30 * 86400})
+    asyncio.run(_reconcile_ttl_indexes(db))
+    db.command.assert_awaited_once_with(
+        "collMod", Collections.ATTENDANCE,
+        index={"keyPattern": {"date": 1}, "expireAfterSeconds": 90 * 86400}
+    )
+    collection.drop_index.assert_not_called()
+
+
+def test_reconcile_ttl_recreates_when_collmod_fails(retention_days):
+    retention_days(30)
+    db, collection = _fake_db({"key": [("date", 1)]})
+    db.command.side_effect = OperationFailure("cannot convert", code=72)
+    asyncio.run(_reconcile_ttl_indexes(db))
+    collection.drop_index.assert_awaited_once_with("date_1")
+
+
+def test_reconcile_ttl_drops_index_when_retention_removed(retention_days):
+    retention_days(None)
+    db, collection = _fake_db({"key": [("date", 1)], "expireAfterSeconds": 30 * 86400})
+    asyncio.run(_reconcile_ttl_indexes(db))
+    db.command.assert_not_called()
+    collection.drop_index.assert_awaited_once_with("date_1")
+
+
+def test_reconcile_ttl_ignores_missing_index(retention_days):
+    retention_days(30)
+    db, collection = _fake_db(None)
+    asyncio.run(_reconcile_ttl_indexes(db))
+    db.command.assert_not_called()
+    collection.drop_index.assert_not_called()
+
+
+def test_agent_batches_expire_after_a_week_by_default(monkeypatch):
+    monkeypatch.delenv("AGENT_BATCH_RETENTION_DAYS", raising=False)
+    database._env.cache_clear()
+    try:
+        assert _ttl_options(Collections.AGENT_BATCHES, "created_date") == {"expireAfterSeconds": 7 * 86400}
+    finally:
+        database._env.cache_clear()
@@ -0,0 +1,170 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.models.database import Collections
+from app.tools import external_api_tool
+from app.tools.external_api_tool import ExternalAPITool
+
+
+@pytest.fixture(scope="module")
+def tool():
+    return ExternalAPITool()
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    """Replace the Motor collections with mocks, one per collection name."""
+    fakes = {}
+
+    def get_collection(name):
+        return fakes.setdefault(name, MagicMock())
+
+    monkeypatch.setattr(external_api_tool, "get_collection", get_collection)
+    monkeypatch.setattr(external_api_tool, "_run_side_effects", AsyncMock())
+    return get_collection
+
+
+@pytest.mark.parametrize("enquiry_type, staff", [
+    ("Yoga classes", "Sarah Johnson"),
+    ("PILATES", "Mike Chen"),
+    # Several keywords: the first in the assignment table wins, not the first in the text
+    ("pilates and yoga class", "Sarah Johnson"),
+    ("membership for fitness", "Jessica Williams"),
+    ("parking", "Customer Service Team"),
+])
+def test_assign_enquiry_to_staff(tool, enquiry_type, staff):
+    assert tool._assign_enquiry_to_staff(enquiry_type) == staff
+
+
+def _create_client(tool, **overrides):
+    kwargs = {"name": "Jane Doe", "email": "jane@example.com", "phone": "+15550100", **overrides}
+    return orjson.loads(asyncio.run(tool._create_client(**kwargs)))
+
+
+def test_create_client_inserts_new_client(tool, collections):
+    clients = collections(Collections.CLIENTS)
+    new_id = ObjectId()
+    clients.find_one = AsyncMock(return_value=None)
+    clients.update_one = AsyncMock(return_value=SimpleNamespace(upserted_id=new_id))
+
+    result = _create_client(tool)
+
+    assert result["success"] is True
+    assert result["client_id"] == str(new_id)
+    query, update = clients.update_one.await_args.args
+    assert query == {"email": "jane@example.com"}
+    assert update["$setOnInsert"]["phone"] == "+15550100"
+    assert clients.update_one.await_args.kwargs == {"upsert": True}
+
+
+def test_create_client_rejects_existing_email(tool, collections):
+    clients = collections(Collections.CLIENTS)
+    existing_id = ObjectId()
+    # No client with the phone; the upsert then matches the existing email
+    clients.find_one = AsyncMock(side_effect=[None, {"_id": existing_id}])
+    clients.update_one = AsyncMock(return_value=SimpleNamespace(upserted_id=None))
+
+    result = _create_client(tool)
+
+    assert result["success"] is False
+    assert result["existing_client_id"] == str(existing_id)
+    assert clients.find_one.await_args.args[0] == {"email": "jane@example.com"}
+
+
+def test_create_client_handles_concurrent_duplicate_insert(tool, collections):
+    clients = collections(Collections.CLIENTS)
+    existing_id = ObjectId()
+    clients.find_one = AsyncMock(side_effect=[None, {"_id": existing_id}])
+    clients.update_one = AsyncMock(side_effect=DuplicateKeyError("E11000 duplicate key"))
+
+    result = _create_client(tool)
+
+    assert result["success"] is False
+    assert result["existing_client_id"] == str(existing_id)
+
+
+def test_create_client_rejects_existing_phone(tool, collections):
+    clients = collections(Collections.CLIENTS)
+    existing_id = ObjectId()
+    clients.find_one = AsyncMock(return_value={"_id": existing_id})
+    clients.update_one = AsyncMock()
+
+    result = _create_client(tool)
+
+    assert result["success"] is False
+    assert result["existing_client_id"] == str(existing_id)
+    clients.update_one.assert_not_called()
+
+
+class _FakeSession:
+    """Session whose transaction fails on first use, as on a standalone server."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def start_transaction(self):
+        return self
+
+
+def _standalone_client():
+    client = MagicMock()
+    client.start_session = AsyncMock(return_value=_FakeSession())
+    return client
+
+
+def _fail_in_transaction(result):
+    async def write(*args, session=None, **kwargs):
+        if session is not None:
+            raise OperationFailure(
+                "Transaction numbers are only allowed on a replica set member or mongos",
+                code=external_api_tool.ILLEGAL_OPERATION,
+            )
+        return result
+    return AsyncMock(side_effect=write)
+
+
+@pytest.fixture
+def approved_gateway(monkeypatch):
+    monkeypatch.setattr(
+        ExternalAPITool, "_integrate_with_payment_gateway",
+        lambda self, data: {"success": True, "transaction_id": "TXN_1"}
+    )
+
+
+def test_process_payment_falls_back_without_transactions(tool, collections, approved_gateway, monkeypatch):
+    monkeypatch.setattr(external_api_tool, "get_client", _standalone_client)
+    payments = collections(Collections.PAYMENTS)
+    orders = collections(Collections.ORDERS)
+    payment_id, order_id = ObjectId(), ObjectId()
+    payments.insert_one = _fail_in_transaction(SimpleNamespace(inserted_id=payment_id))
+    orders.update_one = _fail_in_transaction(None)
+
+    result = orjson.loads(asyncio.run(tool._process_payment(str(order_id), 50.0, "card")))
+
+    assert result["success"] is True
+    assert result["payment_id"] == str(payment_id)
+    # The plain writes after the failed transaction attempt
+    assert payments.insert_one.await_args.kwargs == {}
+    assert orders.update_one.await_args.args[0] == {"_id": order_id}
+    assert orders.update_one.await_args.args[1]["$set"]["status"] == "paid"
+
+
+def test_process_payment_reports_other_write_errors(tool, collections, approved_gateway, monkeypatch):
+    monkeypatch.setattr(external_api_tool, "get_client", _standalone_client)
+    payments = collections(Collections.PAYMENTS)
+    payments.insert_one = AsyncMock(side_effect=OperationFailure("not authorized", code=13))
+
+    result = orjson.loads(asyncio.run(tool._process_payment(ObjectId(), 50.0, "card")))
+
+    assert result["success"] is False
+    assert "not authorized" in result["message"]
+    assert payments.insert_one.await_count == 1
@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from app.models.schemas_internal import CourseRow
+from app.tools import mongodb_tool
+from app.tools.mongodb_tool import MongoDBTool, _COURSE_PROJECTION, _course_doc
+
+
+@pytest.fixture(scope="module")
+def tool():
+    return MongoDBTool()
+
+
+@pytest.mark.parametrize("query_type", list(MongoDBTool._DISPATCH))
+def test_canonical_query_types_pass_through(tool, query_type):
+    assert tool._normalize_query_type(query_type) == query_type
+
+
+@pytest.mark.parametrize("phrase, expected", [
+    ("Show clients", "find_clients"),
+    ("client search and management", "find_clients"),
+    ("search for a client", "search_clients"),
+    ("Recent orders", "get_orders"),
+    ("find an order", "get_orders"),
+    ("list courses", "get_courses"),
+    ("upcoming classes", "get_classes"),
+    ("course and class information", "get_classes"),
+    ("attendance for yesterday", "get_attendance"),
+    ("revenue this month", "revenue_analytics"),
+    ("client analytics", "client_analytics"),
+    ("service statistics", "service_analytics"),
+    ("studio summary", "summary_statistics"),
+])
+def test_phrases_route_to_query_types(tool, phrase, expected):
+    assert tool._normalize_query_type(phrase) == expected
+
+
+def test_unknown_query_types_are_returned_unchanged(tool):
+    assert tool._normalize_query_type("weather forecast") == "weather forecast"
+
+
+def test_cached_courses_match_the_projected_query():
+    row = CourseRow(
+        id=ObjectId(), name="Yoga Basics", instructor="Sarah Johnson", description="Intro",
+        duration_weeks=8, capacity=20, price=99.0, category="yoga", difficulty_level="beginner",
+    )
+    doc = _course_doc(row)
+    assert list(doc) == ["_id", *_COURSE_PROJECTION]
+    assert doc["_id"] == row.id
+
+
+def test_get_classes_filters_on_schedule_range(tool, monkeypatch):
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[])
+    monkeypatch.setattr(mongodb_tool, "get_collection", lambda name: collection)
+
+    asyncio.run(tool._get_classes(instructor="Sarah", date_from="2024-01-01"))
+
+    query = collection.find.call_args.args[0]
+    assert query == {
+        "is_cancelled": False,
+        "instructor": {"$regex": "Sarah", "$options": "i"},
+        "schedule": {"$gte": mongodb_tool._parse_iso_date("2024-01-01")},
+    }
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.models import database
+from app.models.database import run_sync
+
+
+async def _answer():
+    return 42
+
+
+def test_run_sync_requires_a_connected_loop(monkeypatch):
+    monkeypatch.setattr(database._STATE, "loop", None)
+    coro = _answer()
+    with pytest.raises(RuntimeError, match="not connected"):
+        run_sync(coro)
+    # The coroutine is closed rather than left un-awaited
+    assert coro.cr_frame is None
+
+
+def test_run_sync_refuses_to_block_the_loop_thread(monkeypatch):
+    async def call_from_loop():
+        monkeypatch.setattr(database._STATE, "loop", asyncio.get_running_loop())
+        coro = _answer()
+        with pytest.raises(RuntimeError, match="deadlock"):
+            run_sync(coro)
+        assert coro.cr_frame is None
+
+    asyncio.run(call_from_loop())
+
+
+def test_run_sync_runs_on_the_loop_from_a_worker_thread(monkeypatch):
+    async def call_from_worker():
+        monkeypatch.setattr(database._STATE, "loop", asyncio.get_running_loop())
+        return await asyncio.to_thread(run_sync, _answer())
+
+    assert asyncio.run(call_from_worker()) == 42
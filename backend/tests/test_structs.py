@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import msgspec
+from bson import ObjectId
+
+from app.models.structs import encode_document, encode_documents
+
+
+def test_encode_documents_returns_json_array():
+    docs = [{"_id": "a1", "name": "Jane"}, {"_id": "b2", "name": "John"}]
+    assert msgspec.json.decode(encode_documents(docs)) == docs
+
+
+def test_encode_documents_keeps_documents_with_missing_fields():
+    # Legacy documents may lack fields the schemas consider required
+    docs = [{"_id": "c1", "name": "Yoga Basics"}]
+    assert msgspec.json.decode(encode_documents(docs)) == docs
+
+
+def test_encode_documents_keeps_extra_fields():
+    docs = [{"_id": "c1", "name": "Yoga Basics", "legacy_code": "YB-01"}]
+    assert msgspec.json.decode(encode_documents(docs))[0]["legacy_code"] == "YB-01"
+
+
+def test_encode_document_converts_bson_values():
+    oid = ObjectId()
+    doc = {"_id": oid, "schedule": datetime(2024, 1, 15, 9, 30)}
+    assert msgspec.json.decode(encode_document(doc)) == {
+        "_id": str(oid),
+        "schedule": "2024-01-15T09:30:00",
+    }